@@ -0,0 +1,118 @@
+"""Benchmark shaving a synthetic FeatureCollection.
+
+Run from the root of the repository:
+
+    python -m benchmarks.benchmark
+
+For each mode the time taken to shave and to serialize the output, the size
+of the output, the peak memory traced while shaving and the number of memory
+blocks that are left allocated afterwards (the new lists and floats held by
+the output) are reported.
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from geojson_shave.geojson_shave import GEOMETRY_OBJECTS, process_features
+
+
+def make_feature_collection(features, vertices, seed=0):
+    """Create a FeatureCollection of Polygons with random coordinates."""
+    generator = random.Random(seed)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [
+                        [
+                            [generator.uniform(-180, 180), generator.uniform(-90, 90)]
+                            for _ in range(vertices)
+                        ]
+                    ],
+                },
+                "properties": {"id": index},
+            }
+            for index in range(features)
+        ],
+    }
+
+
+def shave(geojson, in_place, polyline, precision):
+    """Shave the input with the given mode."""
+    return process_features(
+        geojson,
+        precision,
+        GEOMETRY_OBJECTS,
+        None,
+        show_progress=False,
+        in_place=in_place,
+        polyline=polyline,
+    )
+
+
+def measure(raw, in_place, polyline, precision):
+    """Measure the cost of shaving the input.
+
+    Times are taken on a separate run from the memory measurements, as
+    tracing memory allocations slows Python down unevenly.
+    """
+    geojson = json.loads(raw)
+    start = time.perf_counter()
+    output = shave(geojson, in_place, polyline, precision)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    size = len(json.dumps(output, separators=(",", ":")))
+    dump_elapsed = time.perf_counter() - start
+    del output, geojson
+
+    geojson = json.loads(raw)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    output = shave(geojson, in_place, polyline, precision)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(
+        statistic.count_diff
+        for statistic in after.compare_to(before, "filename")
+        if statistic.count_diff > 0
+    )
+    return elapsed, dump_elapsed, size, peak, blocks
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--features", type=int, default=20000)
+    parser.add_argument("--vertices", type=int, default=50)
+    parser.add_argument("-d", "--decimal_points", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = json.dumps(make_feature_collection(args.features, args.vertices))
+    print(f"{args.features} Polygons of {args.vertices} vertices")
+    print(
+        f"{'Mode':<12}{'Shave (s)':>10}{'Dump (s)':>10}{'Size (MB)':>11}"
+        f"{'Peak (MB)':>11}{'New blocks':>12}"
+    )
+    for name, in_place, polyline in (
+        ("copy", False, None),
+        ("in place", True, None),
+        ("polyline", True, "rings"),
+    ):
+        elapsed, dump_elapsed, size, peak, blocks = measure(
+            raw, in_place, polyline, args.decimal_points
+        )
+        print(
+            f"{name:<12}{elapsed:>10.2f}{dump_elapsed:>10.2f}{size / 1e6:>11.1f}"
+            f"{peak / 1e6:>11.1f}{blocks:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""Store shaved Feature objects as columnar buffers, and read them back.
+
+The container is a ``.npz`` file: a zip archive of ``.npy`` arrays that
+``numpy.load`` can open directly, written here with the standard library only.
+Geometries are laid out in the manner of GeoArrow, as flat coordinate arrays
+indexed by offset arrays:
+
+- ``geometry_type``: uint8 per Feature, using the WKB codes (1 Point,
+  2 LineString, 3 Polygon, 4 MultiPoint, 5 MultiLineString, 6 MultiPolygon,
+  7 GeometryCollection), or 0 for a null geometry.
+- ``geometry_offsets``: int64, Feature to member geometries. A Feature has
+  one member geometry, or one per geometry of its GeometryCollection.
+- ``member_type``: uint8 per member geometry.
+- ``part_offsets``: int64, member geometry to parts (the polygons of a
+  MultiPolygon; other types have a single part).
+- ``ring_offsets``: int64, part to rings (the rings of a polygon or the lines
+  of a MultiLineString; other types have a single ring).
+- ``coord_offsets``: int64, ring to positions.
+- ``coords``: float64 of shape (positions, dimensions) for the interleaved
+  layout, or ``x``, ``y`` (and ``z``...) float64 arrays for the separated
+  layout. Dimensions missing from a position are stored as NaN.
+
+The properties, the other members of each Feature and the top-level members
+are stored in ``attributes.json``, the first two as sparse columns: the values
+of each key, with the indices of the Feature objects that have it unless they
+all do.
+"""
+
+import array
+import ast
+import json
+import math
+import struct
+import sys
+import zipfile
+
+LAYOUTS = ("interleaved", "separated")
+
+GEOMETRY_TYPES = (
+    None,
+    "Point",
+    "LineString",
+    "Polygon",
+    "MultiPoint",
+    "MultiLineString",
+    "MultiPolygon",
+    "GeometryCollection",
+)
+
+DIMENSION_NAMES = ("x", "y", "z", "m")
+
+# Nesting depth of the coordinates of each geometry type, from parts to rings
+# to positions.
+_DEPTHS = {
+    "Point": 0,
+    "LineString": 1,
+    "MultiPoint": 1,
+    "Polygon": 2,
+    "MultiLineString": 2,
+    "MultiPolygon": 3,
+}
+
+_DTYPES = {"<i8": "q", "<f8": "d", "|u1": "B"}
+
+
+class _Columns:
+    """Collect the members of many objects as one column per key.
+
+    Columns are sparse: each holds the values of its key and, unless every
+    object has the key, the indices of the objects that have it.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+
+    def append(self, members):
+        """Add the members of the next object."""
+        for key, value in members.items():
+            if (column := self.columns.get(key)) is None:
+                column = self.columns[key] = ([], [])
+            column[0].append(self.length)
+            column[1].append(value)
+        self.length += 1
+
+    def to_json(self):
+        """Return the columns as JSON-serializable objects."""
+        return {
+            "length": self.length,
+            "columns": {
+                key: (
+                    {"values": values}
+                    if len(rows) == self.length
+                    else {"rows": rows, "values": values}
+                )
+                for key, (rows, values) in self.columns.items()
+            },
+        }
+
+
+def _rows(columns):
+    """Rebuild the members of each object from _Columns.to_json output."""
+    rows = [{} for _ in range(columns["length"])]
+    for key, column in columns["columns"].items():
+        for row, value in zip(column.get("rows", range(len(rows))), column["values"]):
+            rows[row][key] = value
+    return rows
+
+
+class ColumnarWriter:
+    """Append Feature objects to columnar buffers and save them to a file."""
+
+    def __init__(self, layout="interleaved"):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Error: unknown columnar layout {layout!r}.")
+        self.layout = layout
+        self.geometry_type = array.array("B")
+        self.geometry_offsets = array.array("q", [0])
+        self.member_type = array.array("B")
+        self.part_offsets = array.array("q", [0])
+        self.ring_offsets = array.array("q", [0])
+        self.coord_offsets = array.array("q", [0])
+        self.dimensions = [array.array("d"), array.array("d")]
+        self.properties = _Columns()
+        self.null_properties = []
+        self.feature_members = _Columns()
+
+    def add_feature(self, feature):
+        """Append a Feature object."""
+        geometry = feature.get("geometry")
+        if geometry is None:
+            self.geometry_type.append(0)
+        elif geometry["type"] == "GeometryCollection":
+            self.geometry_type.append(GEOMETRY_TYPES.index("GeometryCollection"))
+            for geometry_object in geometry["geometries"]:
+                self._add_geometry(geometry_object)
+        else:
+            self.geometry_type.append(GEOMETRY_TYPES.index(geometry["type"]))
+            self._add_geometry(geometry)
+        self.geometry_offsets.append(len(self.member_type))
+
+        if (properties := feature.get("properties")) is None:
+            self.null_properties.append(len(self.geometry_type) - 1)
+            properties = {}
+        self.properties.append(properties)
+        self.feature_members.append(
+            {
+                key: value
+                for key, value in feature.items()
+                if key not in ("type", "geometry", "properties")
+            }
+        )
+
+    def _add_geometry(self, geometry):
+        """Append a geometry object that is not a GeometryCollection."""
+        if (geometry_type := geometry["type"]) not in _DEPTHS:
+            raise ValueError(
+                f"Error: {geometry_type} can't be nested in a GeometryCollection."
+            )
+        self.member_type.append(GEOMETRY_TYPES.index(geometry_type))
+        parts = geometry["coordinates"]
+        depth = _DEPTHS[geometry_type]
+        if depth < 3:
+            parts = [parts]
+        for rings in parts:
+            if depth < 2:
+                rings = [rings]
+            for positions in rings:
+                if depth == 0:
+                    positions = [positions] if positions else []
+                for position in positions:
+                    self._add_position(position)
+                self.coord_offsets.append(len(self.dimensions[0]))
+            self.ring_offsets.append(len(self.coord_offsets) - 1)
+        self.part_offsets.append(len(self.ring_offsets) - 1)
+
+    def _add_position(self, position):
+        """Append a position, padding missing dimensions with NaN."""
+        if len(position) > len(DIMENSION_NAMES):
+            raise ValueError("Error: positions can't have more than 4 dimensions.")
+        while len(position) > len(self.dimensions):
+            self.dimensions.append(
+                array.array("d", [math.nan]) * len(self.dimensions[0])
+            )
+        for index, dimension in enumerate(self.dimensions):
+            dimension.append(position[index] if index < len(position) else math.nan)
+
+    def save(
+        self, file, geojson_type="FeatureCollection", members=None, precision=None
+    ):
+        """Write the container to a path or binary file.
+
+        members holds the top-level members other than "type" and "features".
+        precision is the number of decimal points the coordinates were
+        truncated to, if known.
+        """
+        attributes = {
+            "type": geojson_type,
+            "precision": precision,
+            "members": members or {},
+            "properties": self.properties.to_json(),
+            "null_properties": self.null_properties,
+            "feature_members": self.feature_members.to_json(),
+        }
+        with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as container:
+            for name in (
+                "geometry_type",
+                "geometry_offsets",
+                "member_type",
+                "part_offsets",
+                "ring_offsets",
+                "coord_offsets",
+            ):
+                values = getattr(self, name)
+                container.writestr(f"{name}.npy", _npy(values, (len(values),)))
+            if self.layout == "interleaved":
+                coords = array.array("d")
+                for position in zip(*self.dimensions):
+                    coords.extend(position)
+                container.writestr(
+                    "coords.npy",
+                    _npy(coords, (len(self.dimensions[0]), len(self.dimensions))),
+                )
+            else:
+                for name, values in zip(DIMENSION_NAMES, self.dimensions):
+                    container.writestr(f"{name}.npy", _npy(values, (len(values),)))
+            container.writestr("attributes.json", json.dumps(attributes))
+
+
+def _npy(values, shape):
+    """Encode an array as a version 1.0 .npy file."""
+    descr = next(key for key, code in _DTYPES.items() if code == values.typecode)
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {shape}, }}"
+    # The header is padded so that the data starts on a 64-byte boundary.
+    header += " " * (63 - (10 + len(header)) % 64) + "\n"
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return (
+        b"\x93NUMPY\x01\x00"
+        + struct.pack("<H", len(header))
+        + header.encode("latin-1")
+        + values.tobytes()
+    )
+
+
+def _load_npy(data):
+    """Decode a .npy file written by _npy."""
+    if data[:6] != b"\x93NUMPY":
+        raise ValueError("Error: please provide a valid columnar file.")
+    if data[6] == 1:
+        (header_length,), start = struct.unpack("<H", data[8:10]), 10
+    else:
+        (header_length,), start = struct.unpack("<I", data[8:12]), 12
+    header = ast.literal_eval(data[start : start + header_length].decode("latin-1"))
+    if header["descr"] not in _DTYPES or header["fortran_order"]:
+        raise ValueError("Error: please provide a valid columnar file.")
+    values = array.array(_DTYPES[header["descr"]])
+    values.frombytes(data[start + header_length :])
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values.byteswap()
+    return values, header["shape"]
+
+
+def write_columnar(geojson, file, layout="interleaved", precision=None):
+    """Write a FeatureCollection or Feature as columnar buffers, recording
+    the precision its coordinates were truncated to."""
+    writer = ColumnarWriter(layout)
+    if geojson.get("type") == "Feature":
+        writer.add_feature(geojson)
+        writer.save(file, "Feature", precision=precision)
+        return
+    for feature in geojson["features"]:
+        writer.add_feature(feature)
+    writer.save(
+        file,
+        members={
+            key: value
+            for key, value in geojson.items()
+            if key not in ("type", "features")
+        },
+        precision=precision,
+    )
+
+
+def columnar_precision(file):
+    """Return the precision recorded by write_columnar, or None."""
+    try:
+        with zipfile.ZipFile(file) as container:
+            return json.loads(container.read("attributes.json")).get("precision")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError("Error: please provide a valid columnar file.") from e
+
+
+def read_columnar(file):
+    """Turn a container written by write_columnar back into GeoJSON."""
+    try:
+        with zipfile.ZipFile(file) as container:
+            names = set(container.namelist())
+            arrays = {
+                name[:-4]: _load_npy(container.read(name))
+                for name in names
+                if name.endswith(".npy")
+            }
+            attributes = json.loads(container.read("attributes.json"))
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError("Error: please provide a valid columnar file.") from e
+
+    if "coords" in arrays:
+        coords, (_, dimension_count) = arrays["coords"]
+        dimensions = [coords[index::dimension_count] for index in range(dimension_count)]
+    else:
+        dimensions = [
+            arrays[name][0] for name in DIMENSION_NAMES if name in arrays
+        ]
+    positions = [
+        [value for value in position if not math.isnan(value)]
+        for position in zip(*dimensions)
+    ]
+
+    geometry_type = arrays["geometry_type"][0]
+    geometry_offsets = arrays["geometry_offsets"][0]
+    member_type = arrays["member_type"][0]
+    part_offsets = arrays["part_offsets"][0]
+    ring_offsets = arrays["ring_offsets"][0]
+    coord_offsets = arrays["coord_offsets"][0]
+
+    properties = _rows(attributes["properties"])
+    feature_members = _rows(attributes["feature_members"])
+    null_properties = set(attributes["null_properties"])
+
+    def member(index):
+        name = GEOMETRY_TYPES[member_type[index]]
+        parts = []
+        for part in range(part_offsets[index], part_offsets[index + 1]):
+            rings = [
+                positions[coord_offsets[ring] : coord_offsets[ring + 1]]
+                for ring in range(ring_offsets[part], ring_offsets[part + 1])
+            ]
+            parts.append(rings)
+        depth = _DEPTHS[name]
+        coordinates = parts if depth == 3 else parts[0]
+        if depth < 2:
+            coordinates = coordinates[0]
+        if depth == 0:
+            coordinates = coordinates[0] if coordinates else []
+        return {"type": name, "coordinates": coordinates}
+
+    features = []
+    for index, code in enumerate(geometry_type):
+        members = range(geometry_offsets[index], geometry_offsets[index + 1])
+        if code == 0:
+            geometry = None
+        elif GEOMETRY_TYPES[code] == "GeometryCollection":
+            geometry = {
+                "type": "GeometryCollection",
+                "geometries": [member(geometry_object) for geometry_object in members],
+            }
+        else:
+            geometry = member(members[0])
+        feature = {"type": "Feature"}
+        feature.update(feature_members[index])
+        feature["geometry"] = geometry
+        if index in null_properties:
+            feature["properties"] = None
+        else:
+            feature["properties"] = properties[index]
+        features.append(feature)
+
+    if attributes["type"] == "Feature":
+        return features[0]
+    return {"type": "FeatureCollection", "features": features, **attributes["members"]}
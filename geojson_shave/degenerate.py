@@ -0,0 +1,136 @@
+"""Truncuate coordinates while removing the lines and rings that degenerate.
+
+At low precision neighbouring positions round to the same value, so small
+rings collapse to zero area and short lines to a single position. While
+rounding, positions equal to the one before them are dropped and the area of
+each ring (or the length of each line) is summed in the same pass. Rings
+with fewer than four positions, no area or an area below min_area, and lines
+with fewer than two positions, no length or a length below min_length, are
+then removed. Areas and lengths are in coordinate units, e.g. square degrees.
+
+A Polygon whose exterior ring is removed is removed with its holes. A
+geometry with nothing left is empty, and so is the Feature holding it.
+"""
+
+def _round_position(position, precision, in_place):
+    """Truncuate the values of a position."""
+    if not in_place:
+        return [float(round(value, precision)) for value in position]
+    for index in range(len(position)):
+        position[index] = float(round(position[index], precision))
+    return position
+
+
+def round_line(line, precision, ring=False, in_place=False):
+    """Truncuate the positions of a line or ring, leaving out positions that
+    round to the one before them.
+
+    Returns the line and its length, or for a ring its area. With in_place
+    the line's own lists are reused.
+    """
+    positions = line if in_place else []
+    count = 0
+    measure = 0.0
+    previous = None
+    for position in line:
+        position = _round_position(position, precision, in_place)
+        if position == previous:
+            continue
+        if previous is not None:
+            if ring:  # The shoelace formula.
+                measure += previous[0] * position[1] - position[0] * previous[1]
+            else:
+                measure += (
+                    (position[0] - previous[0]) ** 2 + (position[1] - previous[1]) ** 2
+                ) ** 0.5
+        if in_place:
+            positions[count] = position
+        else:
+            positions.append(position)
+        count += 1
+        previous = position
+    if in_place:
+        del positions[count:]
+    if ring:
+        return positions, abs(measure) / 2
+    return positions, measure
+
+
+def _keep(line, measure, ring, min_area, min_length):
+    """Whether a rounded line or ring is kept."""
+    if ring:
+        return len(line) >= 4 and measure > 0 and measure >= min_area
+    return len(line) >= 2 and measure > 0 and measure >= min_length
+
+
+def _round_polygon(rings, precision, min_area, in_place):
+    """Round the rings of a Polygon, returning None if its exterior ring
+    degenerates."""
+    kept = []
+    for number, ring in enumerate(rings):
+        ring, area = round_line(ring, precision, True, in_place)
+        if _keep(ring, area, True, min_area, 0):
+            kept.append(ring)
+        elif number == 0:
+            return None
+    if in_place:
+        rings[:] = kept
+        return rings
+    return kept
+
+
+def round_geometry(geometry, precision, min_area=0, min_length=0, in_place=False):
+    """Truncuate the coordinates of a geometry object, removing the lines,
+    rings and parts that degenerate.
+
+    Returns the geometry, a copy of it unless in_place, or None if nothing
+    is left of it. Point and MultiPoint objects are only rounded.
+    """
+    geometry_type = geometry["type"]
+    if geometry_type == "GeometryCollection":
+        geometries = []
+        for geometry_object in geometry["geometries"]:
+            geometry_object = round_geometry(
+                geometry_object, precision, min_area, min_length, in_place
+            )
+            if geometry_object is not None:
+                geometries.append(geometry_object)
+        if not geometries:
+            return None
+        if in_place:
+            geometry["geometries"][:] = geometries
+            return geometry
+        return {**geometry, "geometries": geometries}
+
+    coordinates = geometry["coordinates"]
+    if geometry_type == "Point":
+        coordinates = _round_position(coordinates, precision, in_place)
+    elif geometry_type == "MultiPoint":
+        coordinates = [
+            _round_position(position, precision, in_place) for position in coordinates
+        ]
+    elif geometry_type == "Polygon":
+        coordinates = _round_polygon(coordinates, precision, min_area, in_place)
+    elif geometry_type == "MultiPolygon":
+        polygons = []
+        for polygon in coordinates:
+            polygon = _round_polygon(polygon, precision, min_area, in_place)
+            if polygon is not None:
+                polygons.append(polygon)
+        coordinates = polygons
+    else:  # LineString and MultiLineString.
+        multi = geometry_type == "MultiLineString"
+        lines = []
+        for line in coordinates if multi else [coordinates]:
+            line, length = round_line(line, precision, False, in_place)
+            if _keep(line, length, False, 0, min_length):
+                lines.append(line)
+        coordinates = lines if multi else (lines[0] if lines else None)
+
+    if not coordinates:
+        return None
+    if in_place:
+        if coordinates is not geometry["coordinates"]:
+            geometry["coordinates"][:] = coordinates
+        return geometry
+    return {**geometry, "coordinates": coordinates}
@@ -0,0 +1,145 @@
+"""Estimate the size of the output file before shaving.
+
+A sample of the input's Feature objects is shaved at each candidate precision,
+with and without properties, and the encoded size of the sample is
+extrapolated to the whole file. This lets the tool pick the highest precision
+that fits within a byte budget in a single real pass.
+"""
+
+import json
+
+import humanize
+
+from geojson_shave.geojson_shave import process_features
+
+SAMPLE_SIZE = 1000
+
+
+def sample_features(features, sample_size=SAMPLE_SIZE):
+    """Pick up to sample_size Feature objects spread evenly over the file."""
+    if len(features) <= sample_size:
+        return list(features)
+    step = len(features) / sample_size
+    return [features[int(index * step)] for index in range(sample_size)]
+
+
+def _encoded_size(geojson):
+    """Size in bytes of the GeoJSON object as the tool writes it."""
+    return len(json.dumps(geojson, separators=(",", ":")))
+
+
+def estimate_size(
+    geojson,
+    sample,
+    precision,
+    geometry_to_include,
+    keep_properties,
+    polyline=None,
+    min_area=None,
+    min_length=None,
+):
+    """Estimate the output size of the whole file from a sample of its
+    Feature objects. Feature objects left out of the sample's output are
+    assumed to be left out of the file's in the same proportion."""
+    # Shave a copy, as the sample is modified in place.
+    sample = json.loads(json.dumps(sample))
+    if geojson.get("type") == "Feature":
+        return _encoded_size(
+            process_features(
+                sample[0],
+                precision,
+                geometry_to_include,
+                keep_properties,
+                show_progress=False,
+                in_place=True,
+                polyline=polyline,
+                min_area=min_area,
+                min_length=min_length,
+            )
+        )
+
+    shaved = process_features(
+        {"type": "FeatureCollection", "features": sample},
+        precision,
+        geometry_to_include,
+        keep_properties,
+        show_progress=False,
+        in_place=True,
+        polyline=polyline,
+        min_area=min_area,
+        min_length=min_length,
+    )["features"]
+    total_features = len(geojson["features"]) * len(shaved) / len(sample)
+    if not shaved:
+        return _encoded_size({**geojson, "features": []})
+
+    # The sample's array brackets and commas are not part of any Feature.
+    feature_bytes = (_encoded_size(shaved) - 2 - (len(shaved) - 1)) / len(shaved)
+    skeleton = _encoded_size({**geojson, "features": []})
+    return round(
+        skeleton + feature_bytes * total_features + max(total_features - 1, 0)
+    )
+
+
+def estimate_sizes(
+    geojson,
+    precisions,
+    geometry_to_include,
+    keep_properties,
+    sample_size=SAMPLE_SIZE,
+    polyline=None,
+    min_area=None,
+    min_length=None,
+):
+    """Estimate the output size for each candidate precision, with the
+    properties handled as requested and with the properties removed.
+
+    Returns a list of (precision, properties_kept, estimated_size) tuples.
+    """
+    if (features := geojson.get("features")) is None:
+        if geojson.get("type") != "Feature":
+            raise ValueError("Error: there are no Feature objects in this file.")
+        features = [geojson]
+    sample = sample_features(features, sample_size)
+
+    variants = [(True, keep_properties)] if keep_properties != [] else []
+    variants.append((False, []))
+    estimates = []
+    for properties_kept, keep in variants:
+        for precision in precisions:
+            size = estimate_size(
+                geojson,
+                sample,
+                precision,
+                geometry_to_include,
+                keep,
+                polyline,
+                min_area,
+                min_length,
+            )
+            estimates.append((precision, properties_kept, size))
+    return estimates
+
+
+def choose_precision(estimates, target_size):
+    """Pick the highest precision that fits within the target size,
+    preferring to keep the properties.
+
+    Returns a (precision, properties_kept, estimated_size) tuple, or None
+    when nothing fits.
+    """
+    fitting = [estimate for estimate in estimates if estimate[2] <= target_size]
+    if not fitting:
+        return None
+    return max(fitting, key=lambda estimate: (estimate[1], estimate[0]))
+
+
+def format_estimates(estimates):
+    """Lay out the estimates as a table for the terminal."""
+    lines = [f"{'Decimal points':<16}{'Properties':<12}Estimated size"]
+    for precision, properties_kept, size in estimates:
+        properties = "kept" if properties_kept else "removed"
+        lines.append(
+            f"{precision:<16}{properties:<12}{humanize.naturalsize(size)}"
+        )
+    return "\n".join(lines)
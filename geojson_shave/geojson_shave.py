@@ -5,10 +5,16 @@ import argparse
 from contextlib import suppress
 import json
 import pathlib
+import re
+import sys
+import zipfile
 
 from alive_progress import alive_bar
 import humanize
 
+from geojson_shave.degenerate import round_geometry
+from geojson_shave.polyline import encode_geometry
+
 GEOMETRY_OBJECTS = {
     "Point",
     "MultiPoint",
@@ -19,6 +25,34 @@ GEOMETRY_OBJECTS = {
     "GeometryCollection",
 }
 
+SIZE_UNITS = {
+    "": 1,
+    "b": 1,
+    "k": 1000,
+    "kb": 1000,
+    "kib": 1024,
+    "m": 1000**2,
+    "mb": 1000**2,
+    "mib": 1024**2,
+    "g": 1000**3,
+    "gb": 1000**3,
+    "gib": 1024**3,
+}
+
+# Decimal points kept when -d isn't given and the input doesn't record any.
+DEFAULT_PRECISION = 5
+
+# Memory budget for streaming when --checkpoint is used without --max_memory.
+DEFAULT_MAX_MEMORY = 256 * 1000**2
+
+
+def parse_size(value):
+    """Convert a human-readable size such as "5MB" or "512KiB" to bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", value)
+    if match is None or match.group(2).lower() not in SIZE_UNITS:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
 
 def get_parser():
     """Create the command-line interface."""
@@ -37,6 +71,33 @@ def get_parser():
 
         Replace the properties value with a null value:
             geojson_shave roads.geojson -p
+
+        Keep as many decimal points as fit within 5 MB:
+            geojson_shave roads.geojson --target_size 5MB
+
+        Stream a large file through the tool using about 256 MB of memory:
+            geojson_shave roads.geojson --max_memory 256MB
+
+        Record progress every 5 minutes, then resume after an interruption:
+            geojson_shave huge.geojson --checkpoint huge.checkpoint \\
+                --checkpoint_interval 300
+            geojson_shave huge.geojson --checkpoint huge.checkpoint --resume
+
+        Index a file once, then shave only the Polygons within a bounding box
+        with 8 worker processes:
+            geojson_shave index roads.geojson
+            geojson_shave roads.geojson --index roads.geojson.idx --workers 8 \\
+                -g Polygon --filter_geometry --bbox -10 35 30 60
+
+        Remove the holes, islands and lines that collapse at 3 decimal points
+        or are smaller than 0.0001 square degrees:
+            geojson_shave coastlines.geojson -d 3 --min_area 0.0001
+
+        Write the coordinates of lines as encoded-polyline strings:
+            geojson_shave tracks.geojson --polyline lines
+
+        Write the coordinates as flat arrays for analytics tools:
+            geojson_shave roads.geojson --columnar separated -o roads.npz
         """,
         formatter_class=argparse.RawTextHelpFormatter,
     )
@@ -50,10 +111,9 @@ def get_parser():
     parser.add_argument(
         "-o",
         "--output",
-        type=argparse.FileType("w"),
+        type=pathlib.Path,
         help="""Name and path of the output GeoJSON file. Default path is the
         current working directory.""",
-        default=pathlib.Path.cwd() / "output.geojson",
         required=False,
     )
 
@@ -61,10 +121,10 @@ def get_parser():
         "-d",
         "--decimal_points",
         type=int,
-        help="Number of decimal points to keep when \
-                            truncating coordinates. Default is 5.",
+        help="""Number of decimal points to keep when truncating
+        coordinates. Default is 5, or for a .npz input the number it was
+        written with.""",
         required=False,
-        default=5,
     )
 
     parser.add_argument(
@@ -97,6 +157,146 @@ def get_parser():
         nargs="+",
     )
 
+    parser.add_argument(
+        "--target_size",
+        "--target-size",
+        type=parse_size,
+        help="""Largest acceptable output file size, e.g. 5MB. The highest
+        precision up to --decimal_points that is estimated to fit is used,
+        removing the properties if nothing fits otherwise.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--estimate",
+        help="""Print the estimated output file size for each precision up to
+        --decimal_points, with and without properties, without writing the
+        output file.""",
+        required=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--max_memory",
+        "--max-memory",
+        type=parse_size,
+        help="""Stream the input file through the tool instead of loading it
+        into memory, keeping the data in flight under this size, e.g. 256MB.
+        Feature objects too large to wait in memory are spilled to temporary
+        files.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        type=pathlib.Path,
+        help="""Stream the input file through the tool, periodically flushing
+        the output and recording how far the input has been read in this
+        file, so that an interrupted run can be resumed with --resume.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--checkpoint_interval",
+        type=float,
+        help="Seconds between checkpoints. Default is 60.",
+        required=False,
+        default=60,
+    )
+
+    parser.add_argument(
+        "--resume",
+        help="""Continue an interrupted run from its --checkpoint file. The
+        input file, output file and options must be the same.""",
+        required=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--drop_degenerate",
+        help="""Remove the Polygon holes, MultiPolygon parts and
+        MultiLineString parts that degenerate after rounding (zero area or
+        length), and the Feature objects with nothing left.""",
+        required=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--min_area",
+        type=float,
+        help="""Also remove the rings whose area is below this, in square
+        coordinate units (e.g. square degrees). Implies --drop_degenerate.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--min_length",
+        type=float,
+        help="""Also remove the lines whose length is below this, in
+        coordinate units. Implies --drop_degenerate.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--polyline",
+        type=str,
+        help="""Write the coordinates of LineString and MultiLineString
+        objects as Google encoded-polyline strings at the --decimal_points
+        precision. "rings" also encodes the rings of Polygon and MultiPolygon
+        objects.""",
+        required=False,
+        choices=("lines", "rings"),
+    )
+
+    parser.add_argument(
+        "--columnar",
+        type=str,
+        help="""Write the output as columnar coordinate and offset arrays in a
+        .npz file instead of GeoJSON. The coordinates are either interleaved
+        in one array or separated into one array per dimension. A .npz file
+        written this way can also be passed as the input, to turn it back
+        into GeoJSON; -d, -g and -kp are applied to it again.""",
+        required=False,
+        choices=("interleaved", "separated"),
+    )
+
+    parser.add_argument(
+        "--index",
+        type=pathlib.Path,
+        help="""Sidecar index of the input file written by the index command.
+        The Feature objects are read directly from their byte offsets, and
+        can be filtered with --bbox and --filter_geometry without being
+        parsed.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="""Number of processes to shave an indexed input file with. The
+        Feature objects are split evenly by size. Default is 1.""",
+        required=False,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--bbox",
+        type=float,
+        help="""Only keep the Feature objects whose bounding box intersects
+        this one. Needs --index.""",
+        required=False,
+        metavar=("MIN_X", "MIN_Y", "MAX_X", "MAX_Y"),
+        nargs=4,
+    )
+
+    parser.add_argument(
+        "--filter_geometry",
+        help="""Leave out the Feature objects whose Geometry Object isn't one
+        of --geometry_object. Needs --index.""",
+        required=False,
+        action="store_true",
+    )
+
     args = parser.parse_args()
     return args
 
@@ -113,12 +313,90 @@ def create_coordinates(coordinates, precision):
     return new_coordinates
 
 
-def process_geometry_collection(geometry_collection, precision):
+def round_coordinates(coordinates, precision):
+    """Truncuate coordinates in place and return the same list.
+
+    Unlike create_coordinates no new lists are created: each number is
+    replaced by its rounded value within the list that holds it.
+    """
+    if coordinates and isinstance(coordinates[0], list):
+        for item in coordinates:
+            round_coordinates(item, precision)
+    else:  # A position.
+        for index in range(len(coordinates)):
+            coordinates[index] = float(round(coordinates[index], precision))
+    return coordinates
+
+
+def _round_geometry(
+    geometry_object, precision, in_place, polyline, min_area, min_length
+):
+    """Truncuate the coordinates of a geometry object, removing what
+    degenerates (see geojson_shave.degenerate), then encode its lines as
+    polyline strings if asked to. Returns None if nothing is left."""
+    geometry_object = round_geometry(
+        geometry_object, precision, min_area or 0, min_length or 0, in_place
+    )
+    if (
+        geometry_object is not None
+        and polyline is not None
+        and (encoded := encode_geometry(geometry_object, precision, polyline))
+    ):
+        return encoded
+    return geometry_object
+
+
+def process_geometry_collection(
+    geometry_collection,
+    precision,
+    in_place=False,
+    polyline=None,
+    min_area=None,
+    min_length=None,
+):
     """Parse and truncuate the coordinates of each geometry
-    object nested within a geometry collection."""
+    object nested within a geometry collection.
+
+    With in_place the geometry objects are modified rather than copied,
+    and the geometry collection itself is returned. With polyline ("lines"
+    or "rings") the lines of the geometry objects are encoded as polyline
+    strings instead. With min_area or min_length, degenerate rings, lines
+    and geometry objects are removed, and None is returned if none are
+    left."""
+    if min_area is not None or min_length is not None:
+        geometries = []
+        for geometry_object in geometry_collection["geometries"]:
+            geometry_object = _round_geometry(
+                geometry_object, precision, in_place, polyline, min_area, min_length
+            )
+            if geometry_object is not None:
+                geometries.append(geometry_object)
+        if not geometries:
+            return None
+        if in_place:
+            geometry_collection["geometries"][:] = geometries
+            return geometry_collection
+        return {"type": "GeometryCollection", "geometries": geometries}
+
+    if in_place:
+        geometries = geometry_collection["geometries"]
+        for index, geometry_object in enumerate(geometries):
+            if polyline is not None and (
+                encoded := encode_geometry(geometry_object, precision, polyline)
+            ):
+                geometries[index] = encoded
+            else:
+                round_coordinates(geometry_object["coordinates"], precision)
+        return geometry_collection
+
     new_geometry_collection = {"type": "GeometryCollection"}
     processed_geometry_objects = []
     for geometry_object in geometry_collection["geometries"]:
+        if polyline is not None and (
+            encoded := encode_geometry(geometry_object, precision, polyline)
+        ):
+            processed_geometry_objects.append(encoded)
+            continue
         object_type = geometry_object["type"]
         new_coordinates = create_coordinates(geometry_object["coordinates"], precision)
         processed_geometry_objects.append(
@@ -129,9 +407,110 @@ def process_geometry_collection(geometry_collection, precision):
     return new_geometry_collection
 
 
-def process_features(geojson, precision, geometry_to_include, keep_properties):
+def process_feature(
+    feature,
+    precision,
+    geometry_to_include,
+    keep_properties,
+    in_place=False,
+    polyline=None,
+    min_area=None,
+    min_length=None,
+):
+    """Truncuate the coordinates of a Feature object nested within a
+    FeatureCollection and/or remove its properties. The Feature object
+    is modified and returned.
+
+    With in_place the coordinates are rounded within the Feature's own
+    lists instead of new ones. With polyline ("lines" or "rings") lines
+    are encoded as polyline strings instead. With min_area or min_length
+    (which may be 0), the rings, lines and parts that degenerate after
+    rounding or fall below the threshold are removed, and None is returned
+    instead of a Feature whose geometry has nothing left."""
+    if keep_properties is not None:
+        if not keep_properties:
+            feature["properties"] = {}
+        else:
+            for key in feature["properties"].copy():
+                if key not in keep_properties:
+                    del feature["properties"][key]
+    with suppress(TypeError):  # Feature's "geometry" member has a null value.
+        if (geo_type := feature["geometry"]["type"]) in geometry_to_include:
+            if geo_type == "GeometryCollection":
+                geometry = process_geometry_collection(
+                    feature["geometry"],
+                    precision,
+                    in_place,
+                    polyline,
+                    min_area,
+                    min_length,
+                )
+                if geometry is None:
+                    return None
+                feature["geometry"] = geometry
+            elif min_area is not None or min_length is not None:
+                geometry = _round_geometry(
+                    feature["geometry"],
+                    precision,
+                    in_place,
+                    polyline,
+                    min_area,
+                    min_length,
+                )
+                if geometry is None:
+                    return None
+                feature["geometry"] = geometry
+            elif polyline is not None and (
+                encoded := encode_geometry(feature["geometry"], precision, polyline)
+            ):
+                feature["geometry"] = encoded
+            elif in_place:
+                round_coordinates(feature["geometry"]["coordinates"], precision)
+            else:
+                feature["geometry"]["coordinates"] = create_coordinates(
+                    feature["geometry"]["coordinates"], precision
+                )
+    return feature
+
+
+def process_features(
+    geojson,
+    precision,
+    geometry_to_include,
+    keep_properties,
+    show_progress=True,
+    in_place=False,
+    polyline=None,
+    min_area=None,
+    min_length=None,
+):
     """Process Feature objects, truncuating coordinates and/or replacing
-    the properties member with a blank value."""
+    the properties member with a blank value.
+
+    With in_place the input is reused as the output: coordinates are
+    rounded within the input's own lists and the input object itself is
+    returned, so no new lists or Feature objects are created. Only pass
+    in_place when the input is not needed afterwards, as it is modified.
+
+    With polyline set to "lines" the coordinates of LineString and
+    MultiLineString objects are written as encoded-polyline strings
+    (see geojson_shave.polyline); "rings" also encodes Polygon rings.
+
+    With min_area or min_length, Feature objects whose geometry degenerates
+    after rounding are left out (see process_feature).
+    """
+    if in_place:
+        return _process_features_in_place(
+            geojson,
+            precision,
+            geometry_to_include,
+            keep_properties,
+            show_progress,
+            polyline,
+            min_area,
+            min_length,
+        )
+
     # Create new GeoJSON object.
     if (total_features := geojson.get("features")) is None:
         if geojson.get("type") == "Feature":
@@ -144,54 +523,39 @@ def process_features(geojson, precision, geometry_to_include, keep_properties):
         length = len(total_features)
 
     # Process Feature objects.
-    with alive_bar(length) as progress_bar:
+    with alive_bar(length, disable=not show_progress) as progress_bar:
         progress_bar.title("Processing the input file:")
         if geojson["type"] == "FeatureCollection":
-            for index, feature in enumerate(geojson["features"]):
-                output_geojson["features"].append(feature)
-                if keep_properties is not None:
-                    if not keep_properties:
-                        output_geojson["features"][index]["properties"] = {}
-                    else:
-                        for key in output_geojson["features"][index]["properties"].copy():
-                            if key not in keep_properties:
-                                del output_geojson["features"][index]["properties"][key]
-                with suppress(
-                    TypeError
-                ):  # Feature's "geometry" member has a null value.
-                    if (geo_type := feature["geometry"]["type"]) in geometry_to_include:
-                        if geo_type == "GeometryCollection":
-                            output_geojson["features"][index]["geometry"] = (
-                                process_geometry_collection(
-                                    feature["geometry"], precision
-                                )
-                            )
-                        else:
-                            new_coordinates = create_coordinates(
-                                feature["geometry"]["coordinates"], precision
-                            )
-                            output_geojson["features"][index]["geometry"][
-                                "coordinates"
-                            ] = new_coordinates
+            for feature in geojson["features"]:
+                feature = process_feature(
+                    feature,
+                    precision,
+                    geometry_to_include,
+                    keep_properties,
+                    polyline=polyline,
+                    min_area=min_area,
+                    min_length=min_length,
+                )
+                if feature is not None:
+                    output_geojson["features"].append(feature)
                 progress_bar()
 
         else:  # Only one Feature.
-            if geojson["geometry"]["type"] in geometry_to_include:
-                new_coordinates = create_coordinates(
-                    geojson["geometry"]["coordinates"], precision
+            if (
+                process_feature(
+                    geojson,
+                    precision,
+                    geometry_to_include,
+                    keep_properties,
+                    polyline=polyline,
+                    min_area=min_area,
+                    min_length=min_length,
                 )
-                output_geojson["geometry"] = {
-                    "type": geojson["geometry"]["type"],
-                    "coordinates": new_coordinates,
-                }
-                if keep_properties is not None:
-                    if not keep_properties:
-                        output_geojson["properties"] = {}
-                    else:
-                        for key in output_geojson["features"][index]["properties"].copy():
-                            if key not in keep_properties:
-                                del output_geojson["features"][index]["properties"][key]
-                progress_bar()
+                is None
+            ):  # Nothing is left of its geometry.
+                geojson["geometry"] = None
+            output_geojson["geometry"] = geojson["geometry"]
+            progress_bar()
 
     # Including any non-standard (RFC) top-level keys in the output file.
     for key in geojson.keys():
@@ -200,11 +564,89 @@ def process_features(geojson, precision, geometry_to_include, keep_properties):
     return output_geojson
 
 
+def _process_features_in_place(
+    geojson,
+    precision,
+    geometry_to_include,
+    keep_properties,
+    show_progress,
+    polyline,
+    min_area,
+    min_length,
+):
+    """Process Feature objects, modifying the input object and returning it."""
+    if (features := geojson.get("features")) is None:
+        if geojson.get("type") != "Feature":
+            raise ValueError("Error: there are no Feature objects in this file.")
+        features = [geojson]
+
+    with alive_bar(len(features), disable=not show_progress) as progress_bar:
+        progress_bar.title("Processing the input file:")
+        kept = 0
+        for feature in features:
+            if (
+                process_feature(
+                    feature,
+                    precision,
+                    geometry_to_include,
+                    keep_properties,
+                    in_place=True,
+                    polyline=polyline,
+                    min_area=min_area,
+                    min_length=min_length,
+                )
+                is not None
+            ):
+                features[kept] = feature
+                kept += 1
+            progress_bar()
+    if geojson.get("type") == "Feature":
+        if not kept:  # Nothing is left of its geometry.
+            geojson["geometry"] = None
+        return geojson
+    del features[kept:]
+
+    # Order the members as process_features does, including any
+    # non-standard (RFC) top-level keys after the Feature objects.
+    members = {
+        key: value
+        for key, value in geojson.items()
+        if key not in ("type", "features", "geometry")
+    }
+    geojson.clear()
+    geojson["type"] = "FeatureCollection"
+    geojson["features"] = features
+    geojson.update(members)
+    return geojson
+
+
+def report_sizes(input_path, output_path):
+    """Tell the user how much smaller the output file is."""
+    size_before = pathlib.Path(input_path).stat().st_size
+    size_after = pathlib.Path(output_path).stat().st_size
+    difference = round(((size_before - size_after) / size_before) * 100)
+    print(f"Input file size: {humanize.naturalsize(size_before)}.")
+    print(f"Output file size: {humanize.naturalsize(size_after)}.")
+    print(f"File size reduction: {difference}%")
+
+
 def main():
     """Launch the command-line tool."""
+    if sys.argv[1:2] == ["serve"]:
+        from geojson_shave.server import main as serve
+
+        serve(sys.argv[2:])
+        return
+
+    if sys.argv[1:2] == ["index"]:
+        from geojson_shave.index import main as index
+
+        index(sys.argv[2:])
+        return
+
     args = get_parser()
 
-    if args.decimal_points < 0:
+    if args.decimal_points is not None and args.decimal_points < 0:
         raise ValueError(
             """Please only pass a positive number to the decimal argument."""
         )
@@ -212,28 +654,203 @@ def main():
     if args.properties is True:
         args.keep_properties = []
 
+    if (
+        args.drop_degenerate
+        or args.min_area is not None
+        or args.min_length is not None
+    ):
+        if (args.min_area or 0) < 0 or (args.min_length or 0) < 0:
+            raise ValueError("Error: --min_area and --min_length can't be negative.")
+        args.min_area = args.min_area or 0.0
+        args.min_length = args.min_length or 0.0
+
+    if args.polyline and args.columnar:
+        raise ValueError("Error: --polyline can't be combined with --columnar.")
+
+    if args.columnar and (args.estimate or args.target_size is not None):
+        raise ValueError(
+            "Error: --columnar can't be combined with --estimate or --target_size."
+        )
+
+    columnar_input = zipfile.is_zipfile(args.input.name)  # Written by --columnar.
+    if columnar_input and (
+        args.max_memory is not None
+        or args.checkpoint is not None
+        or args.index is not None
+    ):
+        raise ValueError(
+            "Error: a .npz input can't be combined with --max_memory, "
+            "--checkpoint or --index."
+        )
+
+    if args.decimal_points is None:
+        args.decimal_points = DEFAULT_PRECISION
+        if columnar_input:
+            from geojson_shave.columnar import columnar_precision
+
+            # Don't lose precision that the .npz file was written with.
+            if (precision := columnar_precision(args.input.name)) is not None:
+                args.decimal_points = precision
+
+    if args.resume and args.checkpoint is None:
+        raise ValueError("Error: --resume needs the --checkpoint file to resume.")
+
+    if args.output is None:
+        args.output = pathlib.Path.cwd() / (
+            "output.npz" if args.columnar else "output.geojson"
+        )
+
+    if args.index is None and (args.bbox or args.filter_geometry or args.workers != 1):
+        raise ValueError(
+            "Error: --workers, --bbox and --filter_geometry need an --index."
+        )
+
+    if args.index is not None:
+        if (
+            args.max_memory is not None
+            or args.checkpoint is not None
+            or args.estimate
+            or args.target_size is not None
+            or args.columnar
+        ):
+            raise ValueError(
+                "Error: --index can't be combined with --max_memory, "
+                "--checkpoint, --estimate, --target_size or --columnar."
+            )
+        if args.workers < 1:
+            raise ValueError("Error: --workers must be at least 1.")
+        from geojson_shave.index import FeatureIndex, shave_indexed
+
+        index = FeatureIndex.load(args.index)
+        if not index.is_current(args.input.name):
+            raise ValueError(
+                "Error: the input file has changed since it was indexed, "
+                "please index it again."
+            )
+        with open(args.output, "wb") as output_file:
+            shave_indexed(
+                args.input.name,
+                output_file,
+                index,
+                args.decimal_points,
+                args.geometry_object,
+                args.keep_properties,
+                polyline=args.polyline,
+                min_area=args.min_area,
+                min_length=args.min_length,
+                workers=args.workers,
+                filter_geometry=args.filter_geometry,
+                bbox=args.bbox,
+            )
+        report_sizes(args.input.name, args.output)
+        return
+
+    if args.max_memory is not None or args.checkpoint is not None:
+        if args.estimate or args.target_size is not None or args.columnar:
+            raise ValueError(
+                "Error: --max_memory and --checkpoint can't be combined with "
+                "--estimate, --target_size or --columnar."
+            )
+        from geojson_shave.stream import shave_stream
+
+        if args.resume and not args.checkpoint.exists():
+            print("No checkpoint was recorded, starting from the beginning.")
+            args.resume = False
+        elif args.resume and not args.output.exists():
+            raise ValueError(
+                f"Error: the output file {args.output} to resume is missing."
+            )
+        with open(args.input.name, "rb") as input_file, open(
+            args.output, "r+b" if args.resume else "wb"
+        ) as output_file:
+            shave_stream(
+                input_file,
+                output_file,
+                args.decimal_points,
+                args.geometry_object,
+                args.keep_properties,
+                args.max_memory or DEFAULT_MAX_MEMORY,
+                polyline=args.polyline,
+                min_area=args.min_area,
+                min_length=args.min_length,
+                checkpoint=args.checkpoint,
+                checkpoint_interval=args.checkpoint_interval,
+                resume=args.resume,
+            )
+        report_sizes(args.input.name, args.output)
+        return
+
     # Process input file.
-    with open(args.input.name, "r") as input_file:
-        try:
-            input_geojson = json.load(input_file)
-        except json.decoder.JSONDecodeError as e:
-            raise ValueError("Error: please provide a valid GeoJSON file.") from e
+    if columnar_input:
+        from geojson_shave.columnar import read_columnar
+
+        input_geojson = read_columnar(args.input.name)
+    else:
+        with open(args.input.name, "r") as input_file:
+            try:
+                input_geojson = json.load(input_file)
+            except json.decoder.JSONDecodeError as e:
+                raise ValueError("Error: please provide a valid GeoJSON file.") from e
+
+    # Estimate the output size from a sample of the Feature objects.
+    if args.estimate or args.target_size is not None:
+        from geojson_shave.estimate import (
+            choose_precision,
+            estimate_sizes,
+            format_estimates,
+        )
+
+        estimates = estimate_sizes(
+            input_geojson,
+            range(args.decimal_points, -1, -1),
+            args.geometry_object,
+            args.keep_properties,
+            polyline=args.polyline,
+            min_area=args.min_area,
+            min_length=args.min_length,
+        )
+        print(format_estimates(estimates))
+        if args.estimate:
+            return
+        if (choice := choose_precision(estimates, args.target_size)) is None:
+            raise ValueError(
+                f"Error: the output is estimated to be larger than "
+                f"{humanize.naturalsize(args.target_size)} at any precision."
+            )
+        args.decimal_points, properties_kept, _ = choice
+        if not properties_kept:
+            args.keep_properties = []
+        print(
+            f"Using {args.decimal_points} decimal points"
+            f"{'' if properties_kept else ' and removing the properties'}."
+        )
+
     output_geojson = process_features(
-        input_geojson, args.decimal_points, args.geometry_object, args.keep_properties
+        input_geojson,
+        args.decimal_points,
+        args.geometry_object,
+        args.keep_properties,
+        in_place=True,
+        polyline=args.polyline,
+        min_area=args.min_area,
+        min_length=args.min_length,
     )
 
     # Write to output file.
-    with open(args.output.name, "w", encoding="utf-8") as output_file:
+    if args.columnar:
+        from geojson_shave.columnar import write_columnar
+
         print("Writing to output file...")
-        json.dump(output_geojson, output_file, separators=(",", ":"))
+        write_columnar(
+            output_geojson, args.output, args.columnar, args.decimal_points
+        )
+    else:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            print("Writing to output file...")
+            json.dump(output_geojson, output_file, separators=(",", ":"))
 
     # Exit message to user.
-    size_before = pathlib.Path(args.input.name).stat().st_size
-    size_after = pathlib.Path(args.output.name).stat().st_size
-    difference = round(((size_before - size_after) / size_before) * 100)
-    print(f"Input file size: {humanize.naturalsize(size_before)}.")
-    print(f"Output file size: {humanize.naturalsize(size_after)}.")
-    print(f"File size reduction: {difference}%")
+    report_sizes(args.input.name, args.output)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,363 @@
+"""Build and use a sidecar index of the Feature objects of a GeoJSON file.
+
+``geojson-shave index roads.geojson`` scans the file once and writes
+``roads.geojson.idx``, holding for each Feature object its byte offset and
+length, its geometry type and its bounding box. With the index, Feature
+objects can be read directly, skipped by type or bounding box without being
+parsed, and split evenly by size across worker processes.
+
+The index is a binary file: a header, one fixed-size record per Feature
+object and the other top-level members of the file as JSON.
+"""
+
+import argparse
+import array
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import multiprocessing
+import pathlib
+import struct
+import tempfile
+
+from alive_progress import alive_bar
+import humanize
+
+from geojson_shave.columnar import GEOMETRY_TYPES
+from geojson_shave.geojson_shave import process_feature
+from geojson_shave.stream import FeatureReader, input_identity, write_members
+
+MAGIC = b"GJSI"
+VERSION = 1
+# Magic, version, input size, input modification time, number of records.
+HEADER = struct.Struct("<4sHxxQqQ")
+# Offset, length, geometry type, min x, min y, max x, max y.
+RECORD = struct.Struct("<QIB4d")
+
+# Number of chunks handed to each worker, so that progress is reported often.
+CHUNKS_PER_WORKER = 8
+
+
+def _extend_bbox(bbox, coordinates):
+    """Grow bbox, a [min x, min y, max x, max y] list, to cover coordinates."""
+    if coordinates and isinstance(coordinates[0], list):
+        for item in coordinates:
+            _extend_bbox(bbox, item)
+    elif len(coordinates) >= 2:
+        bbox[0] = min(bbox[0], coordinates[0])
+        bbox[1] = min(bbox[1], coordinates[1])
+        bbox[2] = max(bbox[2], coordinates[0])
+        bbox[3] = max(bbox[3], coordinates[1])
+
+
+def geometry_bbox(geometry):
+    """Return the bounding box of a geometry object, NaN when it has none."""
+    bbox = [math.inf, math.inf, -math.inf, -math.inf]
+    if geometry is not None:
+        if geometry["type"] == "GeometryCollection":
+            for geometry_object in geometry["geometries"]:
+                _extend_bbox(bbox, geometry_object["coordinates"])
+        else:
+            _extend_bbox(bbox, geometry["coordinates"])
+    if bbox[0] == math.inf:
+        return [math.nan] * 4
+    return bbox
+
+
+class FeatureIndex:
+    """The byte offsets, lengths, geometry types and bounding boxes of the
+    Feature objects of a GeoJSON file, as parallel arrays."""
+
+    def __init__(self, input_size=0, input_mtime_ns=0, members=None):
+        self.input_size = input_size
+        self.input_mtime_ns = input_mtime_ns
+        self.members = members or {}
+        self.offsets = array.array("Q")
+        self.lengths = array.array("I")
+        self.geometry_types = array.array("B")
+        self.bboxes = array.array("d")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, offset, length, geometry_type, bbox):
+        """Add the record of the next Feature object."""
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.geometry_types.append(geometry_type)
+        self.bboxes.extend(bbox)
+
+    @classmethod
+    def build(cls, input_path, show_progress=True):
+        """Scan a GeoJSON file once and index its Feature objects."""
+        identity = input_identity(input_path)
+        index = cls(identity["size"], identity["mtime_ns"])
+        size = index.input_size
+        with open(input_path, "rb") as input_file, alive_bar(
+            manual=True, disable=not show_progress
+        ) as progress_bar:
+            progress_bar.title("Indexing the input file:")
+            reader = FeatureReader(input_file)
+            for raw_feature, end_offset in reader:
+                geometry = json.loads(raw_feature).get("geometry")
+                index.append(
+                    end_offset - len(raw_feature),
+                    len(raw_feature),
+                    GEOMETRY_TYPES.index(geometry["type"]) if geometry else 0,
+                    geometry_bbox(geometry),
+                )
+                progress_bar(end_offset / size)
+            progress_bar(1)
+        if not reader.found_features:
+            raise ValueError("Error: only FeatureCollection files can be indexed.")
+        index.members = reader.members
+        return index
+
+    def save(self, path):
+        """Write the index to a file."""
+        with open(path, "wb") as index_file:
+            index_file.write(
+                HEADER.pack(
+                    MAGIC, VERSION, self.input_size, self.input_mtime_ns, len(self)
+                )
+            )
+            for position in range(len(self)):
+                index_file.write(
+                    RECORD.pack(
+                        self.offsets[position],
+                        self.lengths[position],
+                        self.geometry_types[position],
+                        *self.bboxes[position * 4 : position * 4 + 4],
+                    )
+                )
+            index_file.write(json.dumps(self.members).encode("utf-8"))
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save."""
+        with open(path, "rb") as index_file:
+            data = index_file.read()
+        try:
+            magic, version, input_size, input_mtime_ns, count = HEADER.unpack_from(
+                data
+            )
+        except struct.error as e:
+            raise ValueError(f"Error: {path} is not a geojson-shave index.") from e
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Error: {path} is not a geojson-shave index.")
+        end = HEADER.size + count * RECORD.size
+        index = cls(input_size, input_mtime_ns, json.loads(data[end:]))
+        for record in RECORD.iter_unpack(data[HEADER.size : end]):
+            index.append(record[0], record[1], record[2], record[3:])
+        return index
+
+    def is_current(self, input_path):
+        """Whether the input file is unchanged since it was indexed."""
+        return input_identity(input_path) == {
+            "size": self.input_size,
+            "mtime_ns": self.input_mtime_ns,
+        }
+
+    def select(self, geometry_types=None, bbox=None):
+        """Return the positions of the Feature objects with one of the given
+        geometry types (null geometries have the type None) and whose
+        bounding box intersects bbox, without parsing them."""
+        codes = (
+            None
+            if geometry_types is None
+            else {GEOMETRY_TYPES.index(name) for name in geometry_types}
+        )
+        selected = array.array("Q")
+        bboxes = self.bboxes
+        for position, code in enumerate(self.geometry_types):
+            if codes is not None and code not in codes:
+                continue
+            if bbox is not None:
+                min_x, min_y, max_x, max_y = bboxes[position * 4 : position * 4 + 4]
+                # Comparisons with NaN are false, so null geometries are left out.
+                if not (
+                    min_x <= bbox[2]
+                    and max_x >= bbox[0]
+                    and min_y <= bbox[3]
+                    and max_y >= bbox[1]
+                ):
+                    continue
+            selected.append(position)
+        return selected
+
+    def split(self, positions, chunks):
+        """Split positions into up to chunks contiguous runs of about the
+        same number of bytes."""
+        total = sum(self.lengths[position] for position in positions)
+        target = total / chunks if chunks else total
+        runs = []
+        start = 0
+        size = 0
+        for end, position in enumerate(positions, 1):
+            size += self.lengths[position]
+            if size >= target * (len(runs) + 1) and len(runs) < chunks - 1:
+                runs.append(positions[start:end])
+                start = end
+        runs.append(positions[start:])
+        return [run for run in runs if run]
+
+
+def _shave_run(input_path, offsets, lengths, options, part_path):
+    """Shave the Feature objects at the given offsets into a part file.
+
+    This runs in a worker process. Returns the number of Feature objects
+    read and the number written.
+    """
+    written = 0
+    with open(input_path, "rb") as input_file, open(part_path, "wb") as part_file:
+        for offset, length in zip(offsets, lengths):
+            input_file.seek(offset)
+            feature = process_feature(
+                json.loads(input_file.read(length)),
+                options["precision"],
+                options["geometry_to_include"],
+                options["keep_properties"],
+                in_place=True,
+                polyline=options["polyline"],
+                min_area=options["min_area"],
+                min_length=options["min_length"],
+            )
+            if feature is None:  # Nothing is left of its geometry.
+                continue
+            if written:
+                part_file.write(b",")
+            part_file.write(json.dumps(feature, separators=(",", ":")).encode("utf-8"))
+            written += 1
+    return len(offsets), written
+
+
+def shave_indexed(
+    input_path,
+    output_file,
+    index,
+    precision,
+    geometry_to_include,
+    keep_properties,
+    polyline=None,
+    workers=1,
+    filter_geometry=False,
+    bbox=None,
+    show_progress=True,
+    min_area=None,
+    min_length=None,
+):
+    """Shave the Feature objects listed in an index.
+
+    output_file is a binary file. Feature objects whose geometry type isn't in
+    geometry_to_include are left out when filter_geometry is set, as are those
+    that don't intersect bbox, without being parsed. The rest are split evenly
+    by size across worker processes. polyline, min_area and min_length are
+    passed on to process_feature. Without filters the output is the same as
+    writing the result of process_features.
+    """
+    geometry_types = None
+    if filter_geometry:
+        geometry_types = set(geometry_to_include)
+    positions = index.select(geometry_types, bbox)
+    options = {
+        "precision": precision,
+        "geometry_to_include": geometry_to_include,
+        "keep_properties": keep_properties,
+        "polyline": polyline,
+        "min_area": min_area,
+        "min_length": min_length,
+    }
+    runs = index.split(positions, max(workers, 1) * CHUNKS_PER_WORKER)
+
+    output_file.write(b'{"type":"FeatureCollection","features":[')
+    with tempfile.TemporaryDirectory() as directory, alive_bar(
+        len(positions), disable=not show_progress
+    ) as progress_bar:
+        progress_bar.title("Processing the input file:")
+        jobs = []
+        for number, run in enumerate(runs):
+            jobs.append(
+                (
+                    input_path,
+                    array.array("Q", (index.offsets[position] for position in run)),
+                    array.array("I", (index.lengths[position] for position in run)),
+                    options,
+                    pathlib.Path(directory) / f"{number}.part",
+                )
+            )
+        written = []
+        if workers > 1:
+            # Forking while the progress bar's thread runs can deadlock, so
+            # workers are spawned.
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = [executor.submit(_shave_run, *job) for job in jobs]
+                for future in futures:
+                    count, part_written = future.result()
+                    written.append(part_written)
+                    progress_bar(count)
+        else:
+            for job in jobs:
+                count, part_written = _shave_run(*job)
+                written.append(part_written)
+                progress_bar(count)
+
+        separator = b""
+        for job, part_written in zip(jobs, written):
+            if not part_written:
+                continue
+            output_file.write(separator)
+            separator = b","
+            with open(job[-1], "rb") as part_file:
+                while chunk := part_file.read(1024**2):
+                    output_file.write(chunk)
+
+    write_members(output_file, index.members)
+
+
+def get_parser(argv=None):
+    """Create the command-line interface of the index command."""
+    parser = argparse.ArgumentParser(
+        prog="geojson-shave index",
+        description="""Scan a GeoJSON file once and write a sidecar index of
+        the byte offsets, lengths, geometry types and bounding boxes of its
+        Feature objects.""",
+        epilog="""
+        EXAMPLES
+        --------
+        Index a file, then shave it with 8 worker processes:
+            geojson-shave index roads.geojson
+            geojson-shave roads.geojson --index roads.geojson.idx --workers 8
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    parser.add_argument(
+        "input",
+        type=pathlib.Path,
+        help="Input GeoJSON file to index.",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=pathlib.Path,
+        help="Path of the index file. Default is the input path with .idx added.",
+        required=False,
+    )
+
+    args = parser.parse_args(argv)
+    return args
+
+
+def main(argv=None):
+    """Index a GeoJSON file."""
+    args = get_parser(argv)
+    if args.output is None:
+        args.output = args.input.with_name(args.input.name + ".idx")
+
+    index = FeatureIndex.build(args.input)
+    index.save(args.output)
+    print(f"Indexed {len(index)} Feature objects to {args.output}.")
+    print(f"Index file size: {humanize.naturalsize(args.output.stat().st_size)}.")
@@ -0,0 +1,129 @@
+"""Encode line coordinates as Google encoded-polyline strings, and decode them.
+
+An encoded geometry keeps its type, but its "coordinates" member holds a
+string per line (or ring) instead of an array of positions, and two members
+are added so that it can be decoded: "encoding", set to "polyline", and
+"precision", the number of decimal points that were kept. As in Google's
+format, each position is encoded latitude first.
+"""
+
+ENCODING = "polyline"
+
+# Geometry types whose coordinates are encoded, by --polyline mode, with the
+# nesting depth of their lines.
+POLYLINE_TYPES = {
+    "lines": {"LineString": 0, "MultiLineString": 1},
+    "rings": {"LineString": 0, "MultiLineString": 1, "Polygon": 1, "MultiPolygon": 2},
+}
+
+
+def encode_polyline(positions, precision=5):
+    """Encode a list of [longitude, latitude] positions as a polyline string."""
+    factor = 10**precision
+    output = bytearray()
+    append = output.append
+    previous_latitude = previous_longitude = 0
+    for position in positions:
+        # Rounded first as create_coordinates does, as scaling the value
+        # can push it across a rounding boundary, e.g. 2.675 to 267.50000001.
+        latitude = round(round(position[1], precision) * factor)
+        longitude = round(round(position[0], precision) * factor)
+        for delta in (latitude - previous_latitude, longitude - previous_longitude):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                append((0x20 | (value & 0x1F)) + 63)
+                value >>= 5
+            append(value + 63)
+        previous_latitude, previous_longitude = latitude, longitude
+    return output.decode("ascii")
+
+
+def decode_polyline(polyline, precision=5):
+    """Decode a polyline string into a list of [longitude, latitude] positions."""
+    factor = 10**precision
+    positions = []
+    index = latitude = longitude = 0
+    length = len(polyline)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = value = 0
+            while True:
+                byte = ord(polyline[index]) - 63
+                index += 1
+                value |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(value >> 1) if value & 1 else value >> 1)
+        latitude += deltas[0]
+        longitude += deltas[1]
+        positions.append([longitude / factor, latitude / factor])
+    return positions
+
+
+def _map_lines(function, coordinates, depth):
+    """Apply function to each line nested depth levels within coordinates."""
+    if depth == 0:
+        return function(coordinates)
+    return [_map_lines(function, item, depth - 1) for item in coordinates]
+
+
+def _has_elevation(coordinates, depth):
+    """Whether any position has more than two dimensions."""
+    if depth == 0:
+        return any(len(position) > 2 for position in coordinates)
+    return any(_has_elevation(item, depth - 1) for item in coordinates)
+
+
+def encode_geometry(geometry, precision, mode="lines"):
+    """Return a copy of the geometry with its lines encoded as polyline
+    strings, or None for geometry types that the mode doesn't cover and for
+    geometries with elevations, which the format can't hold.
+    """
+    depth = POLYLINE_TYPES[mode].get(geometry["type"])
+    if depth is None or _has_elevation(geometry["coordinates"], depth):
+        return None
+    encoded = {key: value for key, value in geometry.items() if key != "coordinates"}
+    encoded["coordinates"] = _map_lines(
+        lambda line: encode_polyline(line, precision), geometry["coordinates"], depth
+    )
+    encoded["encoding"] = ENCODING
+    encoded["precision"] = precision
+    return encoded
+
+
+def decode_geometry(geometry):
+    """Return the geometry with polyline strings decoded into positions."""
+    if geometry is None:
+        return geometry
+    if geometry["type"] == "GeometryCollection":
+        return {
+            **geometry,
+            "geometries": [decode_geometry(item) for item in geometry["geometries"]],
+        }
+    if geometry.get("encoding") != ENCODING:
+        return geometry
+    precision = geometry["precision"]
+    decoded = {
+        key: value
+        for key, value in geometry.items()
+        if key not in ("coordinates", "encoding", "precision")
+    }
+    decoded["coordinates"] = _map_lines(
+        lambda line: decode_polyline(line, precision),
+        geometry["coordinates"],
+        POLYLINE_TYPES["rings"][geometry["type"]],
+    )
+    return decoded
+
+
+def decode_features(geojson):
+    """Decode the polyline geometries of a FeatureCollection or Feature.
+
+    The Feature objects are modified and the GeoJSON object is returned.
+    """
+    features = geojson["features"] if "features" in geojson else [geojson]
+    for feature in features:
+        feature["geometry"] = decode_geometry(feature.get("geometry"))
+    return geojson
@@ -0,0 +1,470 @@
+"""An HTTP service that shaves GeoJSON documents on demand.
+
+Start it with ``geojson-shave serve`` and POST a GeoJSON document (optionally
+gzip-encoded) to any path. The shave options are passed as query parameters:
+
+    curl --data-binary @roads.geojson \\
+        "http://127.0.0.1:8080/?decimal_points=3&geometry_object=Polygon"
+
+Parsing, truncating and serializing the document is handed to a process pool
+so the event loop only deals with sockets.
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+from urllib.parse import parse_qs, urlsplit
+import zlib
+
+from geojson_shave.geojson_shave import GEOMETRY_OBJECTS, parse_size, process_features
+
+CHUNK_SIZE = 64 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    411: "Length Required",
+    413: "Content Too Large",
+    415: "Unsupported Media Type",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+# Connections read at once for each request processed at once, by default.
+CONNECTIONS_PER_SLOT = 4
+
+TRUE_VALUES = {"", "1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+
+
+class RequestTooLarge(ValueError):
+    """Raised when a request body, once decompressed, exceeds the size limit."""
+
+
+class HTTPError(Exception):
+    """An error that is reported to the client with the given status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def get_parser(argv=None):
+    """Create the command-line interface of the serve command."""
+    parser = argparse.ArgumentParser(
+        prog="geojson-shave serve",
+        description="""Run an HTTP service that shaves GeoJSON documents POSTed
+        to it. Shave options are passed as query parameters.""",
+        epilog="""
+        EXAMPLES
+        --------
+        Listen on all interfaces with 8 worker processes:
+            geojson-shave serve --host 0.0.0.0 --workers 8
+
+        Truncuate a file to 3 decimal points through the service:
+            curl --data-binary @roads.geojson "localhost:8080/?decimal_points=3"
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+
+    parser.add_argument(
+        "--host",
+        type=str,
+        help="Interface to listen on. Default is 127.0.0.1.",
+        required=False,
+        default="127.0.0.1",
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="Port to listen on. Default is 8080.",
+        required=False,
+        default=8080,
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes. Default is the number of CPUs.",
+        required=False,
+        default=os.cpu_count() or 1,
+    )
+
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        help="""Number of requests processed at the same time. Other requests
+        wait for a free slot. Default is twice the number of workers.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--max_connections",
+        type=int,
+        help="""Number of connections whose requests are read at the same
+        time. Other connections wait until one closes. Default is four times
+        max_concurrency.""",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--max_request_size",
+        type=parse_size,
+        help="""Largest accepted request body, after decompression, e.g.
+        100MB. Default is 100MB.""",
+        required=False,
+        default=parse_size("100MB"),
+    )
+
+    args = parser.parse_args(argv)
+    return args
+
+
+def _flag(name, values):
+    """Parse a boolean query parameter."""
+    value = values[-1].lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Error: {name} must be true or false.")
+
+
+def parse_options(query):
+    """Turn the query string of a request into process_features arguments."""
+    params = parse_qs(query, keep_blank_values=True)
+    options = {
+        "precision": 5,
+        "geometry_to_include": GEOMETRY_OBJECTS,
+        "keep_properties": None,
+        "polyline": None,
+        "min_area": None,
+        "min_length": None,
+    }
+    for name, values in params.items():
+        if name in ("decimal_points", "d"):
+            try:
+                options["precision"] = int(values[-1])
+            except ValueError as e:
+                raise ValueError("Error: decimal_points must be an integer.") from e
+            if options["precision"] < 0:
+                raise ValueError(
+                    "Error: please only pass a positive number to decimal_points."
+                )
+        elif name in ("geometry_object", "g"):
+            geometry_to_include = {
+                geometry_object
+                for value in values
+                for geometry_object in value.split(",")
+                if geometry_object
+            }
+            if unknown := geometry_to_include - GEOMETRY_OBJECTS:
+                raise ValueError(
+                    f"Error: unknown geometry object(s): {', '.join(sorted(unknown))}."
+                )
+            options["geometry_to_include"] = geometry_to_include
+        elif name in ("properties", "p"):
+            if _flag(name, values):
+                options["keep_properties"] = []
+        elif name in ("keep_properties", "kp"):
+            if options["keep_properties"] != []:
+                options["keep_properties"] = values[-1].split(",") if values[-1] else []
+        elif name == "polyline":
+            if values[-1] not in ("lines", "rings"):
+                raise ValueError("Error: polyline must be lines or rings.")
+            options["polyline"] = values[-1]
+        elif name == "drop_degenerate":
+            if _flag(name, values):
+                options["min_area"] = options["min_area"] or 0.0
+                options["min_length"] = options["min_length"] or 0.0
+        elif name in ("min_area", "min_length"):
+            try:
+                options[name] = float(values[-1])
+            except ValueError as e:
+                raise ValueError(f"Error: {name} must be a number.") from e
+            if not options[name] >= 0:
+                raise ValueError(f"Error: {name} can't be negative.")
+        else:
+            raise ValueError(f"Error: unknown option {name!r}.")
+    if options["min_area"] is not None or options["min_length"] is not None:
+        options["min_area"] = options["min_area"] or 0.0
+        options["min_length"] = options["min_length"] or 0.0
+    return options
+
+
+def shave_document(body, content_encoding, max_size, options):
+    """Decompress, shave and serialize a GeoJSON document.
+
+    This is the CPU-bound part of a request and runs in a worker process.
+    """
+    if content_encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, max_size + 1)
+        except zlib.error as e:
+            raise ValueError("Error: the request body is not valid gzip.") from e
+        if len(body) > max_size or decompressor.unconsumed_tail:
+            raise RequestTooLarge("Error: the decompressed request body is too large.")
+
+    try:
+        input_geojson = json.loads(body)
+    except (json.decoder.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError("Error: please provide a valid GeoJSON file.") from e
+    if not isinstance(input_geojson, dict):
+        raise ValueError("Error: please provide a valid GeoJSON file.")
+
+    output_geojson = process_features(
+        input_geojson,
+        options["precision"],
+        options["geometry_to_include"],
+        options["keep_properties"],
+        show_progress=False,
+        in_place=True,
+        polyline=options["polyline"],
+        min_area=options["min_area"],
+        min_length=options["min_length"],
+    )
+    return json.dumps(output_geojson, separators=(",", ":")).encode("utf-8")
+
+
+class ShaveServer:
+    """Accept GeoJSON over HTTP and shave it in a pool of worker processes.
+
+    Each connection carries a single request. Requests are read on at most
+    ``max_connections`` connections at once, which bounds memory use to
+    roughly ``max_connections * max_request_size``, and at most
+    ``max_concurrency`` of them are processed in the pool at once. Clients
+    have ``header_timeout`` seconds to send the request line and headers, so
+    idle connections are dropped quickly, and ``read_timeout`` seconds to
+    send the body.
+    """
+
+    def __init__(
+        self,
+        executor,
+        max_concurrency=4,
+        max_request_size=parse_size("100MB"),
+        read_timeout=60,
+        max_connections=None,
+        header_timeout=10,
+    ):
+        self.executor = executor
+        self.max_request_size = max_request_size
+        self.read_timeout = read_timeout
+        self.header_timeout = header_timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections or (
+            max_concurrency * CONNECTIONS_PER_SLOT
+        )
+        self._slots = None
+        self._connections = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Start listening and return the asyncio server."""
+        # Created here so that they belong to the running event loop.
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._connections = asyncio.Semaphore(self.max_connections)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """Serve a single request on a connection."""
+        # Filled in by _process once the request line has been read.
+        request = {"version": "HTTP/1.1"}
+        try:
+            async with self._connections:
+                try:
+                    result = await self._process(reader, writer, request)
+                except HTTPError as e:
+                    await self._send_error(
+                        writer, e.status, e.message, request["version"]
+                    )
+                else:
+                    await self._send(writer, 200, result, version=request["version"])
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away; there is nobody to answer.
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _process(self, reader, writer, request):
+        """Read and validate a request, then shave its body in the pool once
+        a slot is free.
+
+        The HTTP version of the request is recorded in request."""
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), self.header_timeout
+            )
+        except asyncio.LimitOverrunError as e:
+            raise HTTPError(431, "Error: the request headers are too large.") from e
+        except asyncio.TimeoutError as e:
+            raise HTTPError(408, "Error: timed out reading the request.") from e
+
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = request_line.split(" ")
+        except ValueError as e:
+            raise HTTPError(400, "Error: malformed request line.") from e
+        request["version"] = version
+        headers = {}
+        for line in filter(None, header_lines):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method != "POST":
+            raise HTTPError(405, "Error: only POST requests are supported.")
+        try:
+            options = parse_options(urlsplit(target).query)
+        except ValueError as e:
+            raise HTTPError(400, str(e)) from e
+
+        content_encoding = headers.get("content-encoding", "identity").lower()
+        if content_encoding not in ("identity", "gzip"):
+            raise HTTPError(415, "Error: only gzip content encoding is supported.")
+        if "content-length" not in headers:
+            raise HTTPError(411, "Error: a Content-Length header is required.")
+        try:
+            length = int(headers["content-length"])
+        except ValueError as e:
+            raise HTTPError(400, "Error: invalid Content-Length header.") from e
+        if length > self.max_request_size:
+            raise HTTPError(413, "Error: the request body is too large.")
+
+        if (
+            version != "HTTP/1.0"
+            and headers.get("expect", "").lower() == "100-continue"
+        ):
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        try:
+            body = await asyncio.wait_for(
+                reader.readexactly(length), self.read_timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise HTTPError(408, "Error: timed out reading the request.") from e
+
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._slots:
+                return await loop.run_in_executor(
+                    self.executor,
+                    shave_document,
+                    body,
+                    content_encoding,
+                    self.max_request_size,
+                    options,
+                )
+        except RequestTooLarge as e:
+            raise HTTPError(413, str(e)) from e
+        except ValueError as e:
+            raise HTTPError(400, str(e)) from e
+        except Exception as e:
+            raise HTTPError(500, "Error: the document could not be shaved.") from e
+
+    async def _send(
+        self,
+        writer,
+        status,
+        body,
+        content_type="application/geo+json",
+        version="HTTP/1.1",
+    ):
+        """Stream a response body back to the client in chunks.
+
+        HTTP/1.0 clients don't support chunked transfer encoding, so they
+        are sent a Content-Length instead."""
+        chunked = version != "HTTP/1.0"
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                + (
+                    "Transfer-Encoding: chunked\r\n"
+                    if chunked
+                    else f"Content-Length: {len(body)}\r\n"
+                )
+                + "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+        )
+        view = memoryview(body)
+        for start in range(0, len(view), CHUNK_SIZE):
+            chunk = view[start : start + CHUNK_SIZE]
+            if chunked:
+                writer.write(b"%x\r\n" % len(chunk))
+                writer.write(chunk)
+                writer.write(b"\r\n")
+            else:
+                writer.write(chunk)
+            await writer.drain()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _send_error(self, writer, status, message, version="HTTP/1.1"):
+        """Send an error response with a JSON body."""
+        body = json.dumps({"error": message}).encode("utf-8")
+        await self._send(
+            writer, status, body, content_type="application/json", version=version
+        )
+
+
+async def serve(
+    host, port, executor, max_concurrency, max_request_size, max_connections=None
+):
+    """Run the shaving service until cancelled."""
+    shave_server = ShaveServer(
+        executor, max_concurrency, max_request_size, max_connections=max_connections
+    )
+    server = await shave_server.start(host, port)
+    for sock in server.sockets:
+        address = sock.getsockname()
+        print(f"Serving on http://{address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Launch the shaving service."""
+    args = get_parser(argv)
+
+    if args.workers < 1:
+        raise ValueError("Please pass at least one worker to the workers argument.")
+    if args.max_concurrency is None:
+        args.max_concurrency = args.workers * 2
+    if args.max_concurrency < 1:
+        raise ValueError(
+            "Please pass a positive number to the max_concurrency argument."
+        )
+    if args.max_connections is not None and args.max_connections < 1:
+        raise ValueError(
+            "Please pass a positive number to the max_connections argument."
+        )
+
+    # Forked workers would inherit the sockets of open connections and keep
+    # them alive after the server closes them, so workers are spawned.
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        try:
+            asyncio.run(
+                serve(
+                    args.host,
+                    args.port,
+                    executor,
+                    args.max_concurrency,
+                    args.max_request_size,
+                    args.max_connections,
+                )
+            )
+        except KeyboardInterrupt:
+            print("Shutting down...")
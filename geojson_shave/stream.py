@@ -0,0 +1,459 @@
+"""Shave a GeoJSON file without loading it into memory.
+
+The input's "features" array is scanned one Feature object at a time. A
+reader thread, the shaving loop and a writer thread are connected by bounded
+queues. Feature objects that are too large to be kept in memory while they
+wait in a queue are spilled to temporary files.
+
+Long runs can record checkpoints: the output written so far is flushed to
+disk together with a small JSON file holding how far the input has been read,
+so that an interrupted run can be resumed from there.
+"""
+
+from contextlib import suppress
+import json
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+
+from alive_progress import alive_bar
+
+from geojson_shave.geojson_shave import process_feature, process_features
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRUCTURE = re.compile(rb'[{}\[\]"]')
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,}\]\s]+")
+
+QUEUE_DEPTH = 8
+
+# Members of the JSON object held in a checkpoint file.
+CHECKPOINT_KEYS = (
+    "input",
+    "options",
+    "input_offset",
+    "output_offset",
+    "features",
+    "members",
+)
+
+
+class _Done:
+    """Marks the end of a queue."""
+
+
+class FeatureReader:
+    """Iterate over the raw Feature objects of a GeoJSON file.
+
+    Iterating yields a (raw_feature, end_offset) tuple for each element of the
+    top-level "features" array, where end_offset is the byte offset just past
+    the Feature object. found_features tells whether the file has a "features"
+    array at all. Every other top-level member is parsed and collected
+    in ``members``, which is complete once iteration has finished, and the
+    members that come before the "features" array are also kept in
+    ``members_before``. Only the Feature object being scanned and one chunk
+    of the file are held in memory.
+
+    To continue reading from the end offset of a Feature object, pass it as
+    resume_offset along with the members_before of the earlier read.
+    """
+
+    def __init__(self, file, chunk_size=1024**2, resume_offset=None, members=None):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.members = dict(members or {})
+        self.members_before = dict(self.members)
+        self.found_features = False
+        self._resume = resume_offset is not None
+        self._buffer = bytearray()
+        self._position = 0
+        self._base = 0  # File offset of the start of the buffer.
+        if self._resume:
+            self.file.seek(resume_offset)
+            self._base = resume_offset
+
+    def __iter__(self):
+        try:
+            yield from self._scan_object()
+        except (json.decoder.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError("Error: please provide a valid GeoJSON file.") from e
+
+    def _fill(self):
+        """Read the next chunk of the file into the buffer."""
+        chunk = self.file.read(self.chunk_size)
+        self._buffer.extend(chunk)
+        return bool(chunk)
+
+    def _compact(self):
+        """Drop the part of the buffer that has already been consumed."""
+        if self._position >= self.chunk_size:
+            del self._buffer[: self._position]
+            self._base += self._position
+            self._position = 0
+
+    def _peek(self):
+        """Skip whitespace and return the next byte, or None at the end."""
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position : self._position + 1]
+            if not self._fill():
+                return None
+
+    def _expect(self, characters):
+        """Consume the next byte, which must be one of characters."""
+        if (character := self._peek()) is None or character not in characters:
+            raise ValueError("Error: please provide a valid GeoJSON file.")
+        self._position += 1
+        return character
+
+    def _string_end(self, start):
+        """Return the index just past the string starting at start."""
+        while (match := _STRING.match(self._buffer, start)) is None:
+            if not self._fill():
+                raise ValueError("Error: please provide a valid GeoJSON file.")
+        return match.end()
+
+    def _value(self):
+        """Consume the next JSON value and return its raw bytes."""
+        character = self._peek()
+        start = self._position
+        if character == b'"':
+            end = self._string_end(start)
+        elif character in (b"{", b"["):
+            depth = 0
+            index = start
+            while True:
+                if (match := _STRUCTURE.search(self._buffer, index)) is None:
+                    index = len(self._buffer)
+                    if not self._fill():
+                        raise ValueError("Error: please provide a valid GeoJSON file.")
+                    continue
+                token = self._buffer[match.start()]
+                if token == 0x22:  # A string, which may contain brackets.
+                    index = self._string_end(match.start())
+                    continue
+                depth += 1 if token in (0x7B, 0x5B) else -1
+                index = match.start() + 1
+                if depth == 0:
+                    end = index
+                    break
+        elif character is not None:
+            while (
+                match := _SCALAR.match(self._buffer, start)
+            ) is not None and match.end() == len(self._buffer):
+                if not self._fill():
+                    break
+            if match is None:
+                raise ValueError("Error: please provide a valid GeoJSON file.")
+            end = match.end()
+        else:
+            raise ValueError("Error: please provide a valid GeoJSON file.")
+        self._position = end
+        return bytes(self._buffer[start:end])
+
+    def _scan_object(self):
+        """Scan the top-level object, yielding the Feature objects."""
+        if self._resume:
+            yield from self._scan_features()
+            if self._expect(b",}") == b"}":
+                return
+        else:
+            self._expect(b"{")
+            if self._peek() == b"}":
+                self._position += 1
+                return
+        while True:
+            key = json.loads(self._value())
+            self._expect(b":")
+            if key == "features" and self._peek() == b"[":
+                yield from self._scan_features()
+            else:
+                self.members[key] = json.loads(self._value())
+            if self._expect(b",}") == b"}":
+                return
+
+    def _scan_features(self):
+        """Scan the "features" array."""
+        self.found_features = True
+        if self._resume:  # Just past a Feature object within the array.
+            if self._expect(b",]") == b"]":
+                return
+        else:
+            self.members_before = dict(self.members)
+            self._expect(b"[")
+            if self._peek() == b"]":
+                self._position += 1
+                return
+        while True:
+            raw_feature = self._value()
+            yield raw_feature, self._base + self._position
+            if self._expect(b",]") == b"]":
+                return
+            self._compact()
+
+
+class _Spilled:
+    """Raw bytes that are kept in a temporary file while they wait in a queue."""
+
+    def __init__(self, data):
+        self.file = tempfile.TemporaryFile()
+        self.file.write(data)
+
+    def read(self):
+        """Return the bytes and remove the temporary file."""
+        with self.file:
+            self.file.seek(0)
+            return self.file.read()
+
+
+def _hold(data, spill_size):
+    """Keep data in memory, or in a temporary file when it is too large."""
+    return _Spilled(data) if len(data) > spill_size else data
+
+
+def _release(item):
+    """Return the bytes held by _hold."""
+    return item.read() if isinstance(item, _Spilled) else item
+
+
+def _encode(geojson):
+    """Serialize a GeoJSON object the way the tool writes it."""
+    return json.dumps(geojson, separators=(",", ":")).encode("utf-8")
+
+
+def read_checkpoint(path):
+    """Load a checkpoint written by shave_stream."""
+    try:
+        with open(path, "r", encoding="utf-8") as checkpoint_file:
+            state = json.load(checkpoint_file)
+    except (OSError, json.decoder.JSONDecodeError) as e:
+        raise ValueError(f"Error: can't read the checkpoint file {path}.") from e
+    if not isinstance(state, dict) or any(key not in state for key in CHECKPOINT_KEYS):
+        raise ValueError(f"Error: the checkpoint file {path} is incomplete.")
+    return state
+
+
+def _write_checkpoint(path, state):
+    """Replace the checkpoint file, so that it is never left half-written."""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def input_identity(input_file):
+    """Describe the input file, given as a path or an open file, so that a
+    checkpoint or index isn't used with another."""
+    if isinstance(input_file, (str, os.PathLike)):
+        stat = os.stat(input_file)
+    else:
+        stat = os.fstat(input_file.fileno())
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_members(output_file, members):
+    """Close the "features" array of a FeatureCollection, then write its
+    other top-level members and close it."""
+    # Including any non-standard (RFC) top-level keys in the output file.
+    output_file.write(b"]")
+    for key, value in members.items():
+        if key not in ("type", "features", "geometry"):
+            output_file.write(b"," + _encode(key) + b":" + _encode(value))
+    output_file.write(b"}")
+
+
+def shave_stream(
+    input_file,
+    output_file,
+    precision,
+    geometry_to_include,
+    keep_properties,
+    max_memory,
+    show_progress=True,
+    polyline=None,
+    checkpoint=None,
+    checkpoint_interval=60,
+    resume=False,
+    min_area=None,
+    min_length=None,
+):
+    """Shave a GeoJSON file using a bounded amount of memory.
+
+    input_file and output_file are binary files. The output is the same as
+    writing the result of process_features. max_memory is the budget in bytes
+    for the data in flight: the read buffer and the queues between the reader,
+    the shaving loop and the writer. A single Feature object always has to
+    fit in memory while it is being shaved. polyline, min_area and min_length
+    are passed on to process_feature.
+
+    With a checkpoint path, every checkpoint_interval seconds the output is
+    flushed to disk and the input offset reached is recorded in that file. With
+    resume, the run continues from the recorded offset instead, after cutting
+    the output file (which must be opened for reading and writing) back to
+    what had been flushed. If the checkpoint file doesn't exist, as when the
+    run was stopped before its first checkpoint, the run starts over. The
+    checkpoint file is removed once the output is complete.
+    """
+    spill_size = max(max_memory // (4 * QUEUE_DEPTH), 1)
+    chunk_size = max(max_memory // 16, 4096)
+    options = {
+        "precision": precision,
+        "geometry_to_include": sorted(geometry_to_include),
+        "keep_properties": keep_properties,
+        "polyline": polyline,
+        "min_area": min_area,
+        "min_length": min_length,
+    }
+    if resume and not os.path.exists(checkpoint):
+        # Stopped before the first checkpoint, so there is nothing to keep.
+        resume = False
+        output_file.seek(0)
+        output_file.truncate()
+    if resume:
+        state = read_checkpoint(checkpoint)
+        if state["options"] != options or state["input"] != input_identity(
+            input_file
+        ):
+            raise ValueError(
+                "Error: the checkpoint was made with another input file or options."
+            )
+        reader = FeatureReader(
+            input_file, chunk_size, state["input_offset"], state["members"]
+        )
+        if output_file.seek(0, os.SEEK_END) < state["output_offset"]:
+            raise ValueError(
+                "Error: the output file is shorter than when the checkpoint "
+                "was made."
+            )
+        output_file.seek(state["output_offset"])
+        output_file.truncate()
+        features_written = state["features"]
+    else:
+        reader = FeatureReader(input_file, chunk_size)
+        output_file.write(b'{"type":"FeatureCollection","features":[')
+        features_written = 0
+    read_queue = queue.Queue(QUEUE_DEPTH)
+    write_queue = queue.Queue(QUEUE_DEPTH)
+    errors = []
+    # Set when the shaving loop stops early, so that the reader stops too.
+    stop = threading.Event()
+
+    def read():
+        try:
+            for raw_feature, end_offset in reader:
+                if stop.is_set():
+                    break
+                read_queue.put((_hold(raw_feature, spill_size), end_offset))
+        except BaseException as e:  # Re-raised by the shaving loop.
+            read_queue.put(e)
+        read_queue.put(_Done)
+
+    def write():
+        nonlocal features_written
+        last_checkpoint = time.monotonic()
+        while (item := write_queue.get()) is not _Done:
+            data, end_offset = item
+            if errors:
+                if isinstance(data, _Spilled):
+                    data.file.close()
+                continue
+            try:
+                if data := _release(data):
+                    output_file.write(data)
+                    features_written += 1
+                if checkpoint and time.monotonic() - last_checkpoint >= (
+                    checkpoint_interval
+                ):
+                    output_file.flush()
+                    os.fsync(output_file.fileno())
+                    _write_checkpoint(
+                        checkpoint,
+                        {
+                            "input": input_identity(input_file),
+                            "options": options,
+                            "input_offset": end_offset,
+                            "output_offset": output_file.tell(),
+                            "features": features_written,
+                            "members": reader.members_before,
+                        },
+                    )
+                    last_checkpoint = time.monotonic()
+            except BaseException as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=read), threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    try:
+        with alive_bar(None, disable=not show_progress) as progress_bar:
+            progress_bar.title("Processing the input file:")
+            separator = b"," if features_written else b""
+            while (item := read_queue.get()) is not _Done:
+                if isinstance(item, BaseException):
+                    raise item
+                if errors:  # The writer failed; stop and raise its error.
+                    if isinstance(item[0], _Spilled):
+                        item[0].file.close()
+                    break
+                data, end_offset = item
+                feature = process_feature(
+                    json.loads(_release(data)),
+                    precision,
+                    geometry_to_include,
+                    keep_properties,
+                    in_place=True,
+                    polyline=polyline,
+                    min_area=min_area,
+                    min_length=min_length,
+                )
+                if feature is None:  # Nothing is left of its geometry.
+                    write_queue.put((b"", end_offset))
+                else:
+                    write_queue.put(
+                        (_hold(separator + _encode(feature), spill_size), end_offset)
+                    )
+                    separator = b","
+                progress_bar()
+    finally:
+        # Stop the reader if the shaving loop failed, taking what it has
+        # already queued so that it isn't left waiting on a full queue.
+        stop.set()
+        while threads[0].is_alive() or not read_queue.empty():
+            with suppress(queue.Empty):
+                item = read_queue.get(timeout=0.1)
+                if isinstance(item, tuple) and isinstance(item[0], _Spilled):
+                    item[0].file.close()
+        write_queue.put(_Done)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    if not reader.found_features:
+        # A single Feature object rather than a FeatureCollection.
+        output_file.seek(0)
+        output_file.truncate()
+        output_geojson = process_features(
+            reader.members,
+            precision,
+            geometry_to_include,
+            keep_properties,
+            show_progress=False,
+            in_place=True,
+            polyline=polyline,
+            min_area=min_area,
+            min_length=min_length,
+        )
+        output_file.write(_encode(output_geojson))
+    else:
+        write_members(output_file, reader.members)
+
+    if checkpoint:
+        with suppress(FileNotFoundError):
+            os.remove(checkpoint)
@@ -0,0 +1,151 @@
+"""Unit tests for columnar.py"""
+
+import io
+import json
+import unittest
+import zipfile
+
+from geojson_shave.columnar import columnar_precision, read_columnar, write_columnar
+
+
+class TestColumnar(unittest.TestCase):
+    """Tests for the write_columnar and read_columnar functions."""
+
+    def setUp(self):
+        square = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "id": "a",
+                    "geometry": {"type": "Point", "coordinates": [0.123, 0.456]},
+                    "properties": {"id": 1, "name": "Point"},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [[1.0, 2.0, 3.0], [4.0, 5.0]],
+                    },
+                    "properties": {"id": 2, "tags": ["a", "b"]},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Polygon", "coordinates": [square, square]},
+                    "properties": None,
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "MultiPolygon",
+                        "coordinates": [[square], [square, square]],
+                    },
+                    "properties": {},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "GeometryCollection",
+                        "geometries": [
+                            {"type": "MultiPoint", "coordinates": [[5.0, 6.0]]},
+                            {
+                                "type": "MultiLineString",
+                                "coordinates": [[[7.0, 8.0], [9.0, 10.0]], []],
+                            },
+                        ],
+                    },
+                    "properties": {"id": None},
+                },
+                {"type": "Feature", "geometry": None, "properties": {"id": 6}},
+            ],
+            "name": "Mixed",
+        }
+
+    def roundtrip(self, geojson, layout):
+        """Write the GeoJSON to a container and read it back."""
+        container = io.BytesIO()
+        write_columnar(geojson, container, layout)
+        container.seek(0)
+        return read_columnar(container)
+
+    def test_roundtrip(self):
+        """Test that every geometry type and attribute survives both layouts."""
+        for layout in ("interleaved", "separated"):
+            with self.subTest(layout=layout):
+                self.assertEqual(
+                    self.roundtrip(self.feature_collection, layout),
+                    self.feature_collection,
+                )
+
+    def test_roundtrip_feature(self):
+        """Test that a single Feature is read back as a Feature."""
+        feature = self.feature_collection["features"][0]
+        self.assertEqual(self.roundtrip(feature, "interleaved"), feature)
+
+    def test_precision(self):
+        """Test that the precision passed to write_columnar is recorded."""
+        for precision in (None, 3):
+            with self.subTest(precision=precision):
+                container = io.BytesIO()
+                write_columnar(self.feature_collection, container, precision=precision)
+                container.seek(0)
+                self.assertEqual(columnar_precision(container), precision)
+
+    def test_sparse_properties(self):
+        """Test that Feature objects with different property keys read back
+        without each other's keys, and that the container grows linearly."""
+        sizes = []
+        for count in (1000, 4000):
+            feature_collection = {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "geometry": {"type": "Point", "coordinates": [0.0, 0.0]},
+                        "properties": {"id": number, f"tag{number}": "yes"},
+                    }
+                    for number in range(count)
+                ],
+            }
+            container = io.BytesIO()
+            write_columnar(feature_collection, container, "interleaved")
+            sizes.append(len(container.getvalue()))
+            container.seek(0)
+            self.assertEqual(read_columnar(container), feature_collection)
+        self.assertLess(sizes[1], sizes[0] * 6)
+
+    def test_arrays(self):
+        """Test the layout of the coordinate and offset arrays."""
+        container = io.BytesIO()
+        write_columnar(self.feature_collection, container, "separated")
+        with zipfile.ZipFile(container) as archive:
+            self.assertEqual(
+                sorted(archive.namelist()),
+                [
+                    "attributes.json",
+                    "coord_offsets.npy",
+                    "geometry_offsets.npy",
+                    "geometry_type.npy",
+                    "member_type.npy",
+                    "part_offsets.npy",
+                    "ring_offsets.npy",
+                    "x.npy",
+                    "y.npy",
+                    "z.npy",
+                ],
+            )
+            geometry_type = archive.read("geometry_type.npy")
+        # The data of a .npy file starts on a 64-byte boundary.
+        self.assertEqual(len(geometry_type) % 64, 6)
+        self.assertIn(b"'shape': (6,)", geometry_type)
+        self.assertEqual(geometry_type[-6:], bytes([1, 2, 3, 6, 7, 0]))
+
+    def test_invalid_file(self):
+        """Test that a ValueError is raised for a file that isn't a container."""
+        with self.assertRaises(ValueError):
+            read_columnar(io.BytesIO(json.dumps(self.feature_collection).encode()))
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,207 @@
+"""Unit tests for degenerate.py"""
+
+import io
+import json
+import unittest
+
+from geojson_shave.degenerate import round_geometry, round_line
+from geojson_shave.geojson_shave import GEOMETRY_OBJECTS, process_features
+from geojson_shave.stream import shave_stream
+
+
+class TestRoundLine(unittest.TestCase):
+    """Tests for the round_line function."""
+
+    def test_ring_area(self):
+        """Test that positions rounding to the one before them are left out
+        and the area is summed in the same pass, with and without in_place."""
+        ring = [
+            [0.0, 0.0],
+            [0.0001, 0.0001],
+            [2.0, 0.0],
+            [2.0, 1.0],
+            [0.0, 1.0],
+            [0.0, 0.0],
+        ]
+        for in_place in (False, True):
+            with self.subTest(in_place=in_place):
+                line = json.loads(json.dumps(ring))
+                rounded, area = round_line(line, 2, ring=True, in_place=in_place)
+                self.assertEqual(rounded, [ring[0]] + ring[2:])
+                self.assertEqual(area, 2.0)
+                self.assertIs(rounded is line, in_place)
+
+    def test_line_length(self):
+        """Test the length of a line."""
+        self.assertEqual(
+            round_line([[0.0, 0.0], [3.0, 4.0], [3.0, 4.0004]], 3),
+            ([[0.0, 0.0], [3.0, 4.0]], 5.0),
+        )
+
+
+class TestRoundGeometry(unittest.TestCase):
+    """Tests for the round_geometry function."""
+
+    def setUp(self):
+        self.square = [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.0, 0.0]]
+        # Collapses to a single position at 2 decimal points.
+        self.speck = [
+            [0.501, 0.501],
+            [0.502, 0.501],
+            [0.502, 0.502],
+            [0.501, 0.501],
+        ]
+        # Keeps an area of 0.01 at 2 decimal points.
+        self.hole = [[0.2, 0.2], [0.3, 0.2], [0.3, 0.3], [0.2, 0.3], [0.2, 0.2]]
+
+    def round(self, geometry, **kwargs):
+        """Round a geometry to 2 decimal points, checking that a copy and
+        in place give the same result."""
+        copied = round_geometry(json.loads(json.dumps(geometry)), 2, **kwargs)
+        rounded = round_geometry(geometry, 2, in_place=True, **kwargs)
+        self.assertEqual(copied, rounded)
+        return rounded
+
+    def test_polygon_holes(self):
+        """Test that holes are removed when they degenerate or are below
+        min_area."""
+        polygon = {
+            "type": "Polygon",
+            "coordinates": [self.square, self.speck, self.hole],
+        }
+        self.assertEqual(
+            self.round(json.loads(json.dumps(polygon)))["coordinates"],
+            [self.square, self.hole],
+        )
+        self.assertEqual(
+            self.round(polygon, min_area=0.05)["coordinates"], [self.square]
+        )
+
+    def test_multi_geometries(self):
+        """Test that MultiPolygon and MultiLineString parts are removed, and
+        that a geometry with nothing left gives None."""
+        multi_polygon = {
+            "type": "MultiPolygon",
+            "coordinates": [[self.speck, self.hole], [self.square]],
+        }
+        self.assertEqual(self.round(multi_polygon)["coordinates"], [[self.square]])
+        multi_line_string = {
+            "type": "MultiLineString",
+            "coordinates": [[[0.0, 0.0], [0.001, 0.0]], [[0.0, 0.0], [0.0, 1.0]]],
+        }
+        self.assertEqual(
+            self.round(multi_line_string)["coordinates"], [[[0.0, 0.0], [0.0, 1.0]]]
+        )
+        self.assertIsNone(self.round({"type": "Polygon", "coordinates": [self.speck]}))
+        self.assertIsNone(
+            self.round(
+                {"type": "LineString", "coordinates": [[0.0, 0.0], [0.0, 2.0]]},
+                min_length=3,
+            )
+        )
+
+    def test_geometry_collection(self):
+        """Test that empty geometry objects are removed from a collection."""
+        geometry_collection = {
+            "type": "GeometryCollection",
+            "geometries": [
+                {"type": "Polygon", "coordinates": [self.speck]},
+                {"type": "Point", "coordinates": [0.123, 0.456]},
+            ],
+        }
+        self.assertEqual(
+            self.round(geometry_collection)["geometries"],
+            [{"type": "Point", "coordinates": [0.12, 0.46]}],
+        )
+
+
+class TestProcessFeaturesDegenerate(unittest.TestCase):
+    """Tests for the min_area and min_length parameters of process_features."""
+
+    def setUp(self):
+        speck = [[0.501, 0.501], [0.502, 0.501], [0.502, 0.502], [0.501, 0.501]]
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Polygon", "coordinates": [speck]},
+                    "properties": {"id": 1},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [[0.0, 0.0], [1.0, 1.0]],
+                    },
+                    "properties": {"id": 2},
+                },
+                {"type": "Feature", "geometry": None, "properties": {"id": 3}},
+            ],
+        }
+
+    def test_empty_features_removed(self):
+        """Test that Feature objects with nothing left are removed, with and
+        without in_place and when streaming."""
+        expected_ids = [2, 3]
+        for in_place in (False, True):
+            with self.subTest(in_place=in_place):
+                output = process_features(
+                    json.loads(json.dumps(self.feature_collection)),
+                    2,
+                    GEOMETRY_OBJECTS,
+                    None,
+                    show_progress=False,
+                    in_place=in_place,
+                    min_area=0.0,
+                    min_length=0.0,
+                )
+                self.assertEqual(
+                    [feature["properties"]["id"] for feature in output["features"]],
+                    expected_ids,
+                )
+        output_file = io.BytesIO()
+        shave_stream(
+            io.BytesIO(json.dumps(self.feature_collection).encode()),
+            output_file,
+            2,
+            GEOMETRY_OBJECTS,
+            None,
+            1024**2,
+            show_progress=False,
+            min_area=0.0,
+            min_length=0.0,
+        )
+        self.assertEqual(json.loads(output_file.getvalue()), output)
+
+    def test_single_feature(self):
+        """Test that a single Feature with nothing left gets a null
+        geometry, with and without in_place."""
+        for in_place in (False, True):
+            with self.subTest(in_place=in_place):
+                output = process_features(
+                    json.loads(json.dumps(self.feature_collection["features"][0])),
+                    2,
+                    GEOMETRY_OBJECTS,
+                    None,
+                    show_progress=False,
+                    in_place=in_place,
+                    min_area=0.0,
+                    min_length=0.0,
+                )
+                self.assertEqual(
+                    output,
+                    {"type": "Feature", "geometry": None, "properties": {"id": 1}},
+                )
+
+    def test_off_by_default(self):
+        """Test that degenerate geometries are kept without min_area or
+        min_length."""
+        output = process_features(
+            self.feature_collection, 2, GEOMETRY_OBJECTS, None, show_progress=False
+        )
+        self.assertEqual(len(output["features"]), 3)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
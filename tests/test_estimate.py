@@ -0,0 +1,115 @@
+"""Unit tests for estimate.py"""
+
+import json
+import unittest
+
+from geojson_shave.estimate import (
+    choose_precision,
+    estimate_sizes,
+    sample_features,
+)
+from geojson_shave.geojson_shave import GEOMETRY_OBJECTS, process_features
+
+
+class TestEstimateSizes(unittest.TestCase):
+    """Tests for the estimate_sizes function."""
+
+    def setUp(self):
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "name": "roads",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [
+                            [index + 0.123456789, index + 1.123456789],
+                            [index + 2.123456789, index + 3.123456789],
+                        ],
+                    },
+                    "properties": {"id": index, "name": f"Road {index}"},
+                }
+                for index in range(50)
+            ],
+        }
+
+    def shaved_size(self, precision, keep_properties):
+        """Size of the file actually written by the tool."""
+        geojson = json.loads(json.dumps(self.feature_collection))
+        output = process_features(
+            geojson, precision, GEOMETRY_OBJECTS, keep_properties, show_progress=False
+        )
+        return len(json.dumps(output, separators=(",", ":")))
+
+    def test_exact_when_every_feature_is_sampled(self):
+        """Test that the estimate is exact when the sample is the whole file."""
+        estimates = estimate_sizes(
+            self.feature_collection, [5, 2], GEOMETRY_OBJECTS, None
+        )
+        self.assertEqual(
+            estimates,
+            [
+                (5, True, self.shaved_size(5, None)),
+                (2, True, self.shaved_size(2, None)),
+                (5, False, self.shaved_size(5, [])),
+                (2, False, self.shaved_size(2, [])),
+            ],
+        )
+
+    def test_extrapolated_from_sample(self):
+        """Test that an estimate from a sample is close to the real size."""
+        (estimate,) = estimate_sizes(
+            self.feature_collection, [3], GEOMETRY_OBJECTS, [], sample_size=10
+        )
+        self.assertAlmostEqual(
+            estimate[2], self.shaved_size(3, []), delta=self.shaved_size(3, []) * 0.05
+        )
+
+    def test_input_is_not_modified(self):
+        """Test that estimating leaves the input's coordinates untouched."""
+        before = json.dumps(self.feature_collection)
+        estimate_sizes(self.feature_collection, [1], GEOMETRY_OBJECTS, None)
+        self.assertEqual(json.dumps(self.feature_collection), before)
+
+    def test_no_features(self):
+        """Test that a ValueError is raised when there are no Feature objects."""
+        with self.assertRaises(ValueError):
+            estimate_sizes({}, [5], GEOMETRY_OBJECTS, None)
+
+
+class TestChoosePrecision(unittest.TestCase):
+    """Tests for the choose_precision function."""
+
+    def setUp(self):
+        self.estimates = [
+            (3, True, 300),
+            (2, True, 200),
+            (3, False, 150),
+            (2, False, 100),
+        ]
+
+    def test_highest_precision_that_fits(self):
+        """Test that the highest fitting precision keeping the properties
+        is chosen."""
+        self.assertEqual(choose_precision(self.estimates, 250), (2, True, 200))
+
+    def test_properties_removed_when_nothing_else_fits(self):
+        """Test that the properties are only removed as a last resort."""
+        self.assertEqual(choose_precision(self.estimates, 160), (3, False, 150))
+
+    def test_nothing_fits(self):
+        """Test that None is returned when no precision fits."""
+        self.assertIsNone(choose_precision(self.estimates, 50))
+
+
+class TestSampleFeatures(unittest.TestCase):
+    """Tests for the sample_features function."""
+
+    def test_spread_over_file(self):
+        """Test that the sample is spread evenly over the Feature objects."""
+        self.assertEqual(sample_features(list(range(100)), 4), [0, 25, 50, 75])
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,163 @@
+"""Unit tests for index.py"""
+
+import io
+import json
+import math
+import pathlib
+import tempfile
+import unittest
+
+from geojson_shave.geojson_shave import process_features
+from geojson_shave.index import FeatureIndex, geometry_bbox, shave_indexed
+
+
+class TestFeatureIndex(unittest.TestCase):
+    """Tests for the FeatureIndex class and the shave_indexed function."""
+
+    def setUp(self):
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "name": "places",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [10.123456, 50.123456],
+                    },
+                    "properties": {"id": number},
+                }
+                for number in range(20)
+            ]
+            + [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [[-5.123456, -5.123456], [-1.0, -2.0]],
+                    },
+                    "properties": {"id": 20},
+                },
+                {"type": "Feature", "geometry": None, "properties": {"id": 21}},
+            ],
+            "count": 22,
+        }
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.input_path = pathlib.Path(self.directory.name) / "places.geojson"
+        self.input_path.write_text(json.dumps(self.feature_collection, indent=1))
+
+    def shave(self, index, **kwargs):
+        """Shave the indexed input file to 3 decimal points."""
+        output = io.BytesIO()
+        shave_indexed(
+            self.input_path,
+            output,
+            index,
+            3,
+            ["LineString"],
+            None,
+            show_progress=False,
+            **kwargs,
+        )
+        return json.loads(output.getvalue())
+
+    def test_build_and_load(self):
+        """Test that the records point at the Feature objects and survive
+        being saved and loaded."""
+        index = FeatureIndex.build(self.input_path, show_progress=False)
+        index_path = self.input_path.with_name("places.geojson.idx")
+        index.save(index_path)
+        loaded = FeatureIndex.load(index_path)
+        raw = self.input_path.read_bytes()
+        self.assertEqual(len(loaded), 22)
+        for position, feature in enumerate(self.feature_collection["features"]):
+            offset = loaded.offsets[position]
+            self.assertEqual(
+                json.loads(raw[offset : offset + loaded.lengths[position]]), feature
+            )
+        self.assertEqual(list(loaded.geometry_types[-3:]), [1, 2, 0])
+        self.assertEqual(
+            list(loaded.bboxes[80:84]), [-5.123456, -5.123456, -1.0, -2.0]
+        )
+        self.assertEqual(
+            loaded.members,
+            {"type": "FeatureCollection", "name": "places", "count": 22},
+        )
+        self.assertTrue(loaded.is_current(self.input_path))
+
+    def test_geometry_bbox(self):
+        """Test the bounding boxes of a GeometryCollection and a null geometry."""
+        self.assertEqual(
+            geometry_bbox(
+                {
+                    "type": "GeometryCollection",
+                    "geometries": [
+                        {"type": "Point", "coordinates": [1.0, 2.0, 100.0]},
+                        {"type": "MultiPoint", "coordinates": [[-3.0, 4.0]]},
+                    ],
+                }
+            ),
+            [-3.0, 2.0, 1.0, 4.0],
+        )
+        self.assertTrue(all(math.isnan(value) for value in geometry_bbox(None)))
+
+    def test_split(self):
+        """Test that runs are contiguous, cover every position and are
+        about the same size."""
+        index = FeatureIndex.build(self.input_path, show_progress=False)
+        positions = index.select()
+        runs = index.split(positions, 4)
+        self.assertEqual(len(runs), 4)
+        self.assertEqual(
+            [position for run in runs for position in run], list(positions)
+        )
+
+    def test_same_output(self):
+        """Test that the output matches process_features, with one and
+        several workers."""
+        index = FeatureIndex.build(self.input_path, show_progress=False)
+        expected_return_value = process_features(
+            json.loads(json.dumps(self.feature_collection)),
+            3,
+            ["LineString"],
+            None,
+            show_progress=False,
+        )
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                self.assertEqual(
+                    self.shave(index, workers=workers), expected_return_value
+                )
+
+    def test_filters(self):
+        """Test that Feature objects are left out by geometry type and by
+        bounding box, including null geometries."""
+        index = FeatureIndex.build(self.input_path, show_progress=False)
+        output = self.shave(index, filter_geometry=True)
+        self.assertEqual(
+            [feature["properties"]["id"] for feature in output["features"]], [20]
+        )
+        self.assertEqual(output["count"], 22)
+        output = self.shave(index, bbox=[0, 0, 20, 60])
+        self.assertEqual(
+            [feature["properties"]["id"] for feature in output["features"]],
+            list(range(20)),
+        )
+        self.assertEqual(
+            output["features"][0]["geometry"]["coordinates"], [10.123456, 50.123456]
+        )
+
+    def test_invalid_files(self):
+        """Test that a ValueError is raised for a single Feature input and
+        for a file that isn't an index."""
+        feature = self.feature_collection["features"][0]
+        self.input_path.write_text(json.dumps(feature))
+        with self.assertRaises(ValueError):
+            FeatureIndex.build(self.input_path, show_progress=False)
+        with self.assertRaises(ValueError):
+            FeatureIndex.load(self.input_path)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
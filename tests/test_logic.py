@@ -1,15 +1,21 @@
 """Unit tests for geojson_shave.py"""
 
+import json
+import pathlib
+import sys
+import tempfile
 import unittest
 from unittest import mock
 
 from geojson_shave.geojson_shave import (
     create_coordinates,
+    round_coordinates,
     process_geometry_collection,
     process_features,
     GEOMETRY_OBJECTS,
     main,
 )
+from geojson_shave.columnar import write_columnar
 
 
 class TestMain(unittest.TestCase):
@@ -24,6 +30,56 @@ class TestMain(unittest.TestCase):
         with self.assertRaises(ValueError):
             main()
 
+    def test_columnar_with_size_estimates(self):
+        """Test that --columnar can't be combined with --estimate or
+        --target_size, whose estimates are of GeoJSON output."""
+        for options in (["--estimate"], ["--target_size", "20KB"]):
+            argv = ["geojson-shave", __file__, "--columnar", "interleaved"]
+            with self.subTest(options=options), mock.patch.object(
+                sys, "argv", argv + options
+            ), self.assertRaises(ValueError):
+                main()
+
+    def test_index_options_without_index(self):
+        """Test that --workers, --bbox and --filter_geometry raise a
+        ValueError without --index."""
+        for options in (
+            ["--workers", "4"],
+            ["--bbox", "0", "0", "1", "1"],
+            ["--filter_geometry"],
+        ):
+            with self.subTest(options=options), mock.patch.object(
+                sys, "argv", ["geojson-shave", __file__] + options
+            ), self.assertRaises(ValueError):
+                main()
+
+    def test_columnar_input(self):
+        """Test that a .npz input keeps the precision it was written with,
+        and can't be streamed or indexed."""
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = pathlib.Path(directory) / "input.npz"
+            output_path = pathlib.Path(directory) / "output.geojson"
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [0.123456, 0.654321]},
+                "properties": {},
+            }
+            write_columnar(feature, input_path, precision=6)
+            argv = ["geojson-shave", str(input_path), "-o", str(output_path)]
+            with mock.patch.object(sys, "argv", argv):
+                main()
+            self.assertEqual(json.loads(output_path.read_text()), feature)
+
+            for options in (
+                ["--max_memory", "1MB"],
+                ["--checkpoint", str(output_path) + ".checkpoint"],
+                ["--index", str(input_path) + ".idx"],
+            ):
+                with self.subTest(options=options), mock.patch.object(
+                    sys, "argv", argv + options
+                ), self.assertRaises(ValueError):
+                    main()
+
 
 class TestCreateCoordinates(unittest.TestCase):
     """Tests for the create_coordinates function.
@@ -328,6 +384,39 @@ class TestCreateCoordinates(unittest.TestCase):
         )
 
 
+class TestRoundCoordinates(unittest.TestCase):
+    """Tests for the round_coordinates function."""
+
+    def setUp(self):
+        self.multipolygon = [
+            [
+                [
+                    [102.123456, 2.123456],
+                    [103.123456, 2.123456],
+                    [103.123456, 3.123456],
+                    [102, 2.123456],
+                ]
+            ],
+            [[[100.123456, 0.123456], [101.123456, 0.123456, 5.123456]]],
+        ]
+
+    def test_same_result_as_create_coordinates(self):
+        """Test that the coordinates are truncuated as by create_coordinates."""
+        expected_return_value = create_coordinates(self.multipolygon, 3)
+        self.assertEqual(
+            round_coordinates(self.multipolygon, 3), expected_return_value
+        )
+
+    def test_lists_are_reused(self):
+        """Test that the input's lists are modified rather than copied."""
+        ring = self.multipolygon[0][0]
+        position = ring[0]
+        self.assertIs(round_coordinates(self.multipolygon, 3), self.multipolygon)
+        self.assertIs(self.multipolygon[0][0], ring)
+        self.assertIs(ring[0], position)
+        self.assertEqual(position, [102.123, 2.123])
+
+
 class TestProcessGeometryCollection(unittest.TestCase):
     """Tests for the process_geometry_collection function."""
 
@@ -502,6 +591,48 @@ class TestProcessFeatures(unittest.TestCase):
             expected_return_value,
         )
 
+    def test_in_place(self):
+        """Test that in_place gives the same result while reusing the input."""
+        self.feature_collection = {"name": "Roads", **self.feature_collection}
+        expected_return_value = process_features(
+            json.loads(json.dumps(self.feature_collection)),
+            3,
+            GEOMETRY_OBJECTS,
+            ["id"],
+            show_progress=False,
+        )
+        ring = self.feature_collection["features"][1]["geometry"]["coordinates"][0]
+        return_value = process_features(
+            self.feature_collection,
+            3,
+            GEOMETRY_OBJECTS,
+            ["id"],
+            show_progress=False,
+            in_place=True,
+        )
+        self.assertIs(return_value, self.feature_collection)
+        self.assertEqual(
+            json.dumps(return_value), json.dumps(expected_return_value)
+        )
+        self.assertIs(
+            return_value["features"][1]["geometry"]["coordinates"][0], ring
+        )
+
+    def test_in_place_feature(self):
+        """Test that a single Feature is processed in place."""
+        return_value = process_features(
+            self.feature, 3, GEOMETRY_OBJECTS, [], show_progress=False, in_place=True
+        )
+        self.assertIs(return_value, self.feature)
+        self.assertEqual(
+            return_value,
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [100.123, -0.123]},
+                "properties": {},
+            },
+        )
+
     def test_empty_gson_file(self):
         """Test that an exception is raised when an empty
         GeoJSON file is passed."""
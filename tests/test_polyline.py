@@ -0,0 +1,145 @@
+"""Unit tests for polyline.py"""
+
+import json
+import unittest
+
+from geojson_shave.geojson_shave import (
+    GEOMETRY_OBJECTS,
+    create_coordinates,
+    process_features,
+)
+from geojson_shave.polyline import (
+    decode_features,
+    decode_polyline,
+    encode_geometry,
+    encode_polyline,
+)
+
+
+class TestPolyline(unittest.TestCase):
+    """Tests for the encode_polyline and decode_polyline functions."""
+
+    def setUp(self):
+        # The example from Google's description of the format.
+        self.positions = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+        self.polyline = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+    def test_encode(self):
+        """Test that positions are encoded latitude first."""
+        self.assertEqual(encode_polyline(self.positions), self.polyline)
+
+    def test_decode(self):
+        """Test that a polyline is decoded into [longitude, latitude]."""
+        self.assertEqual(decode_polyline(self.polyline), self.positions)
+
+    def test_precision(self):
+        """Test that positions are rounded to the given precision."""
+        positions = [[151.2093456, -33.8688197], [0.0, 0.0], [-0.0000004, 1.5]]
+        self.assertEqual(
+            decode_polyline(encode_polyline(positions, 6), 6),
+            [[151.209346, -33.86882], [0.0, 0.0], [0.0, 1.5]],
+        )
+
+    def test_same_rounding_as_create_coordinates(self):
+        """Test that decoding gives the coordinates create_coordinates does."""
+        positions = [[2.675, 1.005], [-0.125, 0.115], [8.345, -3.215]]
+        for precision in (2, 3):
+            with self.subTest(precision=precision):
+                self.assertEqual(
+                    decode_polyline(encode_polyline(positions, precision), precision),
+                    create_coordinates(positions, precision),
+                )
+
+
+class TestEncodeGeometry(unittest.TestCase):
+    """Tests for the encode_geometry function."""
+
+    def setUp(self):
+        self.polygon = {
+            "type": "Polygon",
+            "coordinates": [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]],
+        }
+
+    def test_modes(self):
+        """Test that Polygon rings are only encoded in the rings mode."""
+        self.assertIsNone(encode_geometry(self.polygon, 5, "lines"))
+        self.assertEqual(
+            encode_geometry(self.polygon, 5, "rings"),
+            {
+                "type": "Polygon",
+                "coordinates": [encode_polyline(self.polygon["coordinates"][0])],
+                "encoding": "polyline",
+                "precision": 5,
+            },
+        )
+
+    def test_elevation(self):
+        """Test that positions with an elevation are not encoded."""
+        self.polygon["coordinates"][0][1].append(10.0)
+        self.assertIsNone(encode_geometry(self.polygon, 5, "rings"))
+
+
+class TestProcessFeaturesPolyline(unittest.TestCase):
+    """Tests for the polyline parameter of process_features."""
+
+    def setUp(self):
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "MultiLineString",
+                        "coordinates": [
+                            [[100.123456, 0.123456], [101.123456, 1.123456]],
+                            [[102.123456, 2.123456], [103.123456, 3.123456]],
+                        ],
+                    },
+                    "properties": {},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "GeometryCollection",
+                        "geometries": [
+                            {"type": "Point", "coordinates": [0.123456, 0.123456]},
+                            {
+                                "type": "LineString",
+                                "coordinates": [[1.123456, 1.123456], [2.1, 3.1]],
+                            },
+                        ],
+                    },
+                    "properties": {},
+                },
+            ],
+        }
+
+    def test_decodes_to_truncuated_coordinates(self):
+        """Test that decoding the output gives the truncuated coordinates,
+        with and without in_place."""
+        expected_return_value = process_features(
+            json.loads(json.dumps(self.feature_collection)),
+            3,
+            GEOMETRY_OBJECTS,
+            None,
+            show_progress=False,
+        )
+        for in_place in (False, True):
+            with self.subTest(in_place=in_place):
+                output = process_features(
+                    json.loads(json.dumps(self.feature_collection)),
+                    3,
+                    GEOMETRY_OBJECTS,
+                    None,
+                    show_progress=False,
+                    in_place=in_place,
+                    polyline="lines",
+                )
+                geometry = output["features"][0]["geometry"]
+                self.assertEqual(geometry["encoding"], "polyline")
+                self.assertIsInstance(geometry["coordinates"][0], str)
+                self.assertEqual(decode_features(output), expected_return_value)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,202 @@
+"""Unit tests for server.py"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import json
+import multiprocessing
+import re
+import unittest
+
+from geojson_shave.server import ShaveServer, parse_options
+from geojson_shave.geojson_shave import GEOMETRY_OBJECTS
+
+
+async def post(port, target, body, headers=None, version="HTTP/1.1"):
+    """Send a request to the server and return the status and decoded body."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"POST {target} {version}\r\nHost: localhost\r\n"
+    if body is not None:
+        head += f"Content-Length: {len(body)}\r\n"
+    for name, value in (headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + (body or b""))
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, chunked = response.partition(b"\r\n\r\n")
+    if head.startswith(b"HTTP/1.1 100 "):  # Interim response to Expect.
+        head, _, chunked = chunked.partition(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    if b"transfer-encoding: chunked" not in head.lower():
+        length = int(re.search(rb"(?i)content-length: (\d+)", head).group(1))
+        assert len(chunked) == length
+        return status, json.loads(chunked)
+    payload = b""
+    while True:
+        size, _, chunked = chunked.partition(b"\r\n")
+        if not int(size, 16):
+            break
+        payload += chunked[: int(size, 16)]
+        chunked = chunked[int(size, 16) + 2 :]
+    return status, json.loads(payload)
+
+
+class TestParseOptions(unittest.TestCase):
+    """Tests for the parse_options function."""
+
+    def test_defaults(self):
+        """Test that an empty query string gives the CLI defaults."""
+        self.assertEqual(
+            parse_options(""),
+            {
+                "precision": 5,
+                "geometry_to_include": GEOMETRY_OBJECTS,
+                "keep_properties": None,
+                "polyline": None,
+                "min_area": None,
+                "min_length": None,
+            },
+        )
+
+    def test_options(self):
+        """Test that each query parameter is parsed."""
+        options = parse_options(
+            "decimal_points=2&geometry_object=Point,Polygon&keep_properties=id,name"
+        )
+        self.assertEqual(options["precision"], 2)
+        self.assertEqual(options["geometry_to_include"], {"Point", "Polygon"})
+        self.assertEqual(options["keep_properties"], ["id", "name"])
+        options = parse_options("min_area=0.5")
+        self.assertEqual((options["min_area"], options["min_length"]), (0.5, 0.0))
+
+    def test_properties_overrides_keep_properties(self):
+        """Test that properties=true drops every property."""
+        self.assertEqual(
+            parse_options("properties=true&keep_properties=id")["keep_properties"], []
+        )
+
+    def test_invalid_options(self):
+        """Test that invalid query parameters raise a ValueError."""
+        for query in (
+            "decimal_points=-1",
+            "geometry_object=Circle",
+            "colour=red",
+            "min_length=-1",
+        ):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                parse_options(query)
+
+
+class TestShaveServer(unittest.IsolatedAsyncioTestCase):
+    """Tests for the ShaveServer class."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    async def asyncSetUp(self):
+        shave_server = ShaveServer(
+            self.executor, max_concurrency=2, max_request_size=1024
+        )
+        self.server = await shave_server.start("127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [0.123456, 0.123456]},
+                    "properties": {"id": 1, "name": "Feature 1"},
+                }
+            ],
+        }
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_shave(self):
+        """Test that the shaved document is returned."""
+        body = json.dumps(self.feature_collection).encode()
+        status, payload = await post(
+            self.port, "/?decimal_points=3&properties=true", body
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["features"][0]["geometry"]["coordinates"], [0.123, 0.123])
+        self.assertEqual(payload["features"][0]["properties"], {})
+
+    async def test_http_1_0(self):
+        """Test that HTTP/1.0 clients get a Content-Length, not chunks."""
+        body = json.dumps(self.feature_collection).encode()
+        status, payload = await post(
+            self.port, "/?decimal_points=3", body, version="HTTP/1.0"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            payload["features"][0]["geometry"]["coordinates"], [0.123, 0.123]
+        )
+
+    async def test_gzip_body(self):
+        """Test that a gzip-encoded body is decompressed before shaving."""
+        body = gzip.compress(json.dumps(self.feature_collection).encode())
+        status, payload = await post(
+            self.port,
+            "/?decimal_points=1",
+            body,
+            {"Content-Encoding": "gzip", "Expect": "100-continue"},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["features"][0]["geometry"]["coordinates"], [0.1, 0.1])
+
+    async def test_request_too_large(self):
+        """Test that bodies over the size limit are rejected, including
+        gzip bodies that only exceed it once decompressed."""
+        self.feature_collection["features"] *= 50
+        body = json.dumps(self.feature_collection).encode()
+        status, _ = await post(self.port, "/", body)
+        self.assertEqual(status, 413)
+
+        status, _ = await post(
+            self.port, "/", gzip.compress(body), {"Content-Encoding": "gzip"}
+        )
+        self.assertEqual(status, 413)
+
+    async def test_idle_connections(self):
+        """Test that clients that never send their headers don't keep
+        other requests from being processed."""
+        idle = [
+            await asyncio.open_connection("127.0.0.1", self.port) for _ in range(2)
+        ]
+        try:
+            body = json.dumps(self.feature_collection).encode()
+            status, _ = await asyncio.wait_for(post(self.port, "/", body), 10)
+            self.assertEqual(status, 200)
+        finally:
+            for _, writer in idle:
+                writer.close()
+
+    async def test_invalid_requests(self):
+        """Test that invalid requests get a client error."""
+        status, _ = await post(self.port, "/", b"not json")
+        self.assertEqual(status, 400)
+
+        status, _ = await post(self.port, "/?decimal_points=x", b"{}")
+        self.assertEqual(status, 400)
+
+        status, _ = await post(self.port, "/", b"{}")
+        self.assertEqual(status, 400)
+
+        status, _ = await post(self.port, "/", None)
+        self.assertEqual(status, 411)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)
@@ -0,0 +1,371 @@
+"""Unit tests for stream.py"""
+
+import errno
+import io
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from geojson_shave.geojson_shave import GEOMETRY_OBJECTS, main, process_features
+from geojson_shave import stream
+from geojson_shave.stream import FeatureReader, shave_stream
+
+# Runs the command-line tool and prints its peak resident set size in KiB.
+# VmHWM is used rather than ru_maxrss, which keeps the peak of the parent
+# process across fork and exec.
+PEAK_RSS_SCRIPT = """
+import re, sys
+from geojson_shave.geojson_shave import main
+sys.argv = ["geojson-shave"] + sys.argv[1:]
+main()
+with open("/proc/self/status") as status:
+    print(re.search(r"VmHWM:\\s+(\\d+) kB", status.read()).group(1))
+"""
+
+
+class TestFeatureReader(unittest.TestCase):
+    """Tests for the FeatureReader class."""
+
+    def setUp(self):
+        self.raw = (
+            b'{"type": "FeatureCollection", "name": "a [tricky] \\"name\\"",\n'
+            b' "features": [\n'
+            b'  {"type": "Feature", "geometry": null, "properties": {"x": "}]"}},\n'
+            b'  {"type": "Feature", "geometry": {"type": "Point",'
+            b' "coordinates": [1.5, -2]}, "properties": {}}\n'
+            b' ],\n "count": 2, "valid": true}'
+        )
+
+    def test_features_and_members(self):
+        """Test that Feature objects are yielded with their end offsets
+        and other members are collected, across many small reads."""
+        reader = FeatureReader(io.BytesIO(self.raw), chunk_size=7)
+        features = list(reader)
+        self.assertEqual(
+            [json.loads(raw) for raw, _ in features],
+            json.loads(self.raw)["features"],
+        )
+        for raw, end in features:
+            self.assertEqual(self.raw[end - len(raw) : end], raw)
+        self.assertEqual(
+            reader.members,
+            {
+                "type": "FeatureCollection",
+                "name": 'a [tricky] "name"',
+                "count": 2,
+                "valid": True,
+            },
+        )
+        self.assertTrue(reader.found_features)
+
+    def test_invalid_file(self):
+        """Test that a ValueError is raised for a truncated file."""
+        with self.assertRaises(ValueError):
+            list(FeatureReader(io.BytesIO(self.raw[:100]), chunk_size=7))
+
+
+class TestShaveStream(unittest.TestCase):
+    """Tests for the shave_stream function."""
+
+    def setUp(self):
+        self.feature_collection = {
+            "type": "FeatureCollection",
+            "name": "roads",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "LineString",
+                        "coordinates": [[index + 0.123456, 1.123456]] * index,
+                    },
+                    "properties": {"id": index, "name": f"Road {index}"},
+                }
+                for index in range(1, 30)
+            ]
+            + [{"type": "Feature", "geometry": None, "properties": {"id": 0}}],
+            "bbox": [0, 1, 30, 2],
+        }
+
+    def shave(self, geojson, max_memory, keep_properties=None):
+        """Return the output of shave_stream and of process_features."""
+        output_file = io.BytesIO()
+        shave_stream(
+            io.BytesIO(json.dumps(geojson, indent=2).encode()),
+            output_file,
+            3,
+            GEOMETRY_OBJECTS,
+            keep_properties,
+            max_memory,
+            show_progress=False,
+        )
+        expected = process_features(
+            geojson, 3, GEOMETRY_OBJECTS, keep_properties, show_progress=False
+        )
+        return output_file.getvalue(), json.dumps(expected, separators=(",", ":"))
+
+    def test_same_output_as_process_features(self):
+        """Test that streaming writes exactly what process_features returns."""
+        output, expected = self.shave(self.feature_collection, 1024**2, ["id"])
+        self.assertEqual(output.decode(), expected)
+
+    def test_spilling(self):
+        """Test that the output is unchanged when every Feature object is
+        spilled to a temporary file."""
+        output, expected = self.shave(self.feature_collection, 64)
+        self.assertEqual(output.decode(), expected)
+
+    def test_single_feature(self):
+        """Test that a file holding a single Feature object is shaved."""
+        output, expected = self.shave(self.feature_collection["features"][3], 1024)
+        self.assertEqual(output.decode(), expected)
+
+    def test_no_features(self):
+        """Test that a ValueError is raised when there are no Feature objects."""
+        with self.assertRaises(ValueError):
+            shave_stream(
+                io.BytesIO(b'{"type": "Topology"}'),
+                io.BytesIO(),
+                3,
+                GEOMETRY_OBJECTS,
+                None,
+                1024,
+                show_progress=False,
+            )
+
+    def test_early_failure_stops_reading(self):
+        """Test that the input isn't read to the end when shaving the first
+        Feature object fails."""
+        features = [{"type": "Feature", "geometry": None, "properties": None}] + [
+            {"type": "Feature", "geometry": None, "properties": {"id": number}}
+            for number in range(20000)
+        ]
+        raw = json.dumps({"type": "FeatureCollection", "features": features})
+        input_file = io.BytesIO(raw.encode())
+        with self.assertRaises(AttributeError):
+            shave_stream(
+                input_file,
+                io.BytesIO(),
+                3,
+                GEOMETRY_OBJECTS,
+                ["id"],
+                64 * 1024,
+                show_progress=False,
+            )
+        self.assertLess(input_file.tell(), len(raw) // 2)
+
+    def test_write_failure_stops_reading(self):
+        """Test that the input isn't read to the end when writing fails."""
+
+        class FullDisk(io.BytesIO):
+            writes = 0
+
+            def write(self, data):
+                self.writes += 1
+                if self.writes > 3:
+                    raise OSError(errno.ENOSPC, "No space left on device")
+                return super().write(data)
+
+        features = [
+            {"type": "Feature", "geometry": None, "properties": {"id": number}}
+            for number in range(20000)
+        ]
+        raw = json.dumps({"type": "FeatureCollection", "features": features})
+        input_file = io.BytesIO(raw.encode())
+        with self.assertRaises(OSError):
+            shave_stream(
+                input_file,
+                FullDisk(),
+                3,
+                GEOMETRY_OBJECTS,
+                None,
+                64 * 1024,
+                show_progress=False,
+            )
+        self.assertLess(input_file.tell(), len(raw) // 2)
+
+
+class TestCheckpoint(unittest.TestCase):
+    """Tests for the checkpoint and resume parameters of shave_stream."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        path = pathlib.Path(self.directory.name)
+        self.input_path = path / "input.geojson"
+        self.output_path = path / "output.geojson"
+        self.checkpoint = path / "checkpoint.json"
+        self.input_path.write_text(
+            json.dumps(
+                {
+                    "type": "FeatureCollection",
+                    "name": "roads",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "geometry": {
+                                "type": "Point",
+                                "coordinates": [index + 0.123456, 0.123456],
+                            },
+                            "properties": {"id": index},
+                        }
+                        for index in range(100)
+                    ],
+                    "bbox": [0, 0, 100, 1],
+                },
+                indent=1,
+            )
+        )
+
+    def shave(self, mode="wb", precision=3, **kwargs):
+        """Run shave_stream from the input file to the output file."""
+        with open(self.input_path, "rb") as input_file, open(
+            self.output_path, mode
+        ) as output_file:
+            shave_stream(
+                input_file,
+                output_file,
+                precision,
+                GEOMETRY_OBJECTS,
+                None,
+                64,
+                show_progress=False,
+                checkpoint=self.checkpoint,
+                checkpoint_interval=0,
+                **kwargs,
+            )
+
+    def interrupt(self):
+        """Start a run that fails after shaving 40 Feature objects."""
+        calls = []
+        original = stream.process_feature
+
+        def process_feature(*args, **kwargs):
+            calls.append(None)
+            if len(calls) > 40:
+                raise KeyboardInterrupt
+            return original(*args, **kwargs)
+
+        with mock.patch.object(stream, "process_feature", process_feature):
+            with self.assertRaises(KeyboardInterrupt):
+                self.shave()
+
+    def test_resume(self):
+        """Test that a resumed run writes the same file as an uninterrupted one."""
+        self.shave()
+        expected = self.output_path.read_bytes()
+        self.assertFalse(self.checkpoint.exists())
+
+        self.interrupt()
+        state = json.loads(self.checkpoint.read_text())
+        self.assertGreater(state["features"], 0)
+        self.assertLessEqual(state["features"], 40)
+        self.shave(mode="r+b", resume=True)
+        self.assertEqual(self.output_path.read_bytes(), expected)
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_resume_without_checkpoint(self):
+        """Test that a run stopped before its first checkpoint starts over."""
+        self.shave()
+        expected = self.output_path.read_bytes()
+        self.output_path.write_bytes(expected[: len(expected) // 2])
+        self.shave(mode="r+b", resume=True)
+        self.assertEqual(self.output_path.read_bytes(), expected)
+
+    def test_resume_with_other_options(self):
+        """Test that a checkpoint can't be resumed with different options."""
+        self.interrupt()
+        with self.assertRaises(ValueError):
+            self.shave(mode="r+b", precision=2, resume=True)
+
+    def test_resume_with_short_output(self):
+        """Test that a ValueError is raised when the output file lost what
+        was flushed before the checkpoint."""
+        self.interrupt()
+        self.output_path.write_bytes(b"")
+        with self.assertRaises(ValueError):
+            self.shave(mode="r+b", resume=True)
+
+    def test_incomplete_checkpoint(self):
+        """Test that a ValueError is raised for a checkpoint missing members."""
+        self.interrupt()
+        state = json.loads(self.checkpoint.read_text())
+        del state["options"]
+        self.checkpoint.write_text(json.dumps(state))
+        with self.assertRaises(ValueError):
+            self.shave(mode="r+b", resume=True)
+
+    def test_resume_without_output(self):
+        """Test that the command-line tool raises a ValueError when resuming
+        without the output file."""
+        self.interrupt()
+        self.output_path.unlink()
+        argv = [
+            "geojson-shave",
+            str(self.input_path),
+            "-o",
+            str(self.output_path),
+            "--checkpoint",
+            str(self.checkpoint),
+            "--resume",
+        ]
+        with mock.patch.object(sys, "argv", argv), self.assertRaises(ValueError):
+            main()
+
+
+@unittest.skipUnless(os.path.exists("/proc/self/status"), "needs /proc")
+class TestPeakMemory(unittest.TestCase):
+    """Measure the peak memory of the command-line tool on a large file."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.input_path = pathlib.Path(cls.directory.name) / "input.geojson"
+        feature = json.dumps(
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": [[151.123456789, -33.123456789]] * 50,
+                },
+                "properties": {"name": "A road"},
+            }
+        )
+        with open(cls.input_path, "w") as input_file:
+            input_file.write('{"type": "FeatureCollection", "features": [')
+            input_file.write(",".join([feature] * 20000))
+            input_file.write("]}")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def peak_rss(self, *options):
+        """Run the tool and return its peak resident set size in bytes."""
+        output_path = pathlib.Path(self.directory.name) / "output.geojson"
+        result = subprocess.run(
+            [sys.executable, "-c", PEAK_RSS_SCRIPT, str(self.input_path)]
+            + ["-o", str(output_path), *options],
+            capture_output=True,
+            check=True,
+            text=True,
+            env={**os.environ, "PYTHONPATH": str(pathlib.Path(__file__).parents[1])},
+        )
+        return int(result.stdout.split()[-1]) * 1024
+
+    def test_max_memory_lowers_peak_rss(self):
+        """Test that --max_memory keeps the peak memory well below that of
+        loading the whole file."""
+        input_size = self.input_path.stat().st_size
+        baseline = self.peak_rss("-d", "3")
+        bounded = self.peak_rss("-d", "3", "--max_memory", "4MB")
+        self.assertLess(bounded, baseline - input_size)
+        self.assertLess(bounded, input_size)
+
+
+if __name__ == "__main__":
+    unittest.main(buffer=True)